@@ -1,7 +1,7 @@
 import os
 import sys
 import datetime
-import json
+import orjson
 from fastapi import APIRouter, Request, HTTPException
 from core.logic import process_with_archetype, load_archetypes
 from core.utils import get_base_dir
@@ -87,7 +87,7 @@ async def conference_rada(request: Request):
     Режим РАДА: обговорення питання між агентами (до 3 агентів).
     Агенти обираються з конфігурації archetypes.yaml.
     """
-    data = await request.json()
+    data = orjson.loads(await request.body())
     text = data.get("text")
     selected_archetypes = data.get("archetypes", [])
     remember = data.get("remember", True)
@@ -99,9 +99,9 @@ async def conference_rada(request: Request):
     archetypes_dict = load_archetypes()
     
     # If no agents specified, take all available (maximum 3)
-    if not selected_archetypes or len(selected_archetypes) == 0:
+    if not selected_archetypes:
         selected_archetypes = list(archetypes_dict.keys())[:3]
-        if len(selected_archetypes) == 0:
+        if not selected_archetypes:
             raise HTTPException(
                 status_code=400, 
                 detail="No agents found in configuration"
@@ -218,8 +218,8 @@ async def conference_rada(request: Request):
             "discussion": discussion_with_names,  # Зберігаємо з назвами
             "consensus": consensus
         }
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(rada_data, f, ensure_ascii=False, indent=4)
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(rada_data))
         
         # Зберігаємо у векторну базу
         if save_chat:
@@ -116,7 +116,7 @@ def set_provider(provider: AIProvider, config: Optional[Dict[str, Any]] = None):
     if config:
         _provider_config.update(config)
 
-def generate_response(model_name: str, system_prompt: str = None, user_message: str = None, context: str = None, conversation_history: list = None, prompt: str = None, chat_id: str = None, **kwargs) -> str:
+def generate_response(model_name: str, system_prompt: str = None, user_message: str = None, context: str = None, conversation_history: list = None, prompt: str = None, chat_id: str = None, stream: bool = False, **kwargs):
     """
     Generate response through current AI provider.
     
@@ -128,10 +128,11 @@ def generate_response(model_name: str, system_prompt: str = None, user_message:
         conversation_history: List of previous messages (deprecated - use chat_id for session reuse)
         prompt: Legacy parameter - full prompt text (used if system_prompt/user_message not provided)
         chat_id: Unique chat ID for session reuse (Google AI ChatSession will be reused for same chat_id)
+        stream: If True, return an iterator of text chunks as the provider emits them
         **kwargs: Additional parameters
     
     Returns:
-        AI response
+        AI response (or iterator of response chunks when stream=True)
     """
     provider = get_current_provider()
     config = get_provider_config()
@@ -154,14 +155,14 @@ def generate_response(model_name: str, system_prompt: str = None, user_message:
     
     if provider == AIProvider.GOOGLE_AI:
         logger.debug(f"Using Google AI provider: {model_name}")
-        return _generate_google_ai(model_name, system_prompt=system_prompt, user_message=user_message, context=context, conversation_history=conversation_history, prompt=prompt, chat_id=chat_id, config=config, **kwargs)
+        return _generate_google_ai(model_name, system_prompt=system_prompt, user_message=user_message, context=context, conversation_history=conversation_history, prompt=prompt, chat_id=chat_id, config=config, stream=stream, **kwargs)
     elif provider == AIProvider.OPENAI:
         logger.debug(f"Using OpenAI provider: {model_name}")
-        return _generate_openai(model_name, system_prompt=system_prompt, user_message=user_message, context=context, conversation_history=conversation_history, prompt=prompt, chat_id=chat_id, config=config, **kwargs)
+        return _generate_openai(model_name, system_prompt=system_prompt, user_message=user_message, context=context, conversation_history=conversation_history, prompt=prompt, chat_id=chat_id, config=config, stream=stream, **kwargs)
     else:
         raise ValueError(f"Unknown provider: {provider}")
 
-def _generate_google_ai(model_name: str, system_prompt: str = None, user_message: str = None, context: str = None, conversation_history: list = None, prompt: str = None, chat_id: str = None, config: Dict[str, Any] = None, **kwargs) -> str:
+def _generate_google_ai(model_name: str, system_prompt: str = None, user_message: str = None, context: str = None, conversation_history: list = None, prompt: str = None, chat_id: str = None, config: Dict[str, Any] = None, stream: bool = False, **kwargs):
     """
     Generate response through Google AI with ChatSession reuse.
     
@@ -209,7 +210,8 @@ def _generate_google_ai(model_name: str, system_prompt: str = None, user_message
             chat = _google_ai_chat_sessions[session_key]
             response = chat.send_message(
                 current_message,
-                generation_config=genai.types.GenerationConfig(**generation_config)
+                generation_config=genai.types.GenerationConfig(**generation_config),
+                stream=stream
             )
         else:
             # Create new ChatSession
@@ -219,7 +221,7 @@ def _generate_google_ai(model_name: str, system_prompt: str = None, user_message
                 system_instruction=system_prompt if system_prompt else None
             )
             
-            if conversation_history and len(conversation_history) > 0:
+            if conversation_history:
                 # Convert conversation_history to Google AI format
                 history = []
                 for msg in conversation_history:
@@ -240,7 +242,8 @@ def _generate_google_ai(model_name: str, system_prompt: str = None, user_message
             # Send message
             response = chat.send_message(
                 current_message,
-                generation_config=genai.types.GenerationConfig(**generation_config)
+                generation_config=genai.types.GenerationConfig(**generation_config),
+                stream=stream
             )
     else:
         # No chat_id - use stateless approach
@@ -250,7 +253,7 @@ def _generate_google_ai(model_name: str, system_prompt: str = None, user_message
         )
         
         # If we have conversation history, use ChatSession for context (one-time)
-        if conversation_history and len(conversation_history) > 0:
+        if conversation_history:
             # Convert conversation_history to Google AI format
             history = []
             for msg in conversation_history:
@@ -264,7 +267,8 @@ def _generate_google_ai(model_name: str, system_prompt: str = None, user_message
             chat = model.start_chat(history=history)
             response = chat.send_message(
                 current_message,
-                generation_config=genai.types.GenerationConfig(**generation_config)
+                generation_config=genai.types.GenerationConfig(**generation_config),
+                stream=stream
             )
         else:
             # No history - use simple generate_content
@@ -282,12 +286,16 @@ def _generate_google_ai(model_name: str, system_prompt: str = None, user_message
             
             response = model.generate_content(
                 full_prompt,
-                generation_config=genai.types.GenerationConfig(**generation_config)
+                generation_config=genai.types.GenerationConfig(**generation_config),
+                stream=stream
             )
     
+    if stream:
+        # ChatSession records the turn in its history once the stream is exhausted
+        return (chunk.text for chunk in response if chunk.text)
     return response.text.strip()
 
-def _generate_openai(model_name: str, system_prompt: str = None, user_message: str = None, context: str = None, conversation_history: list = None, prompt: str = None, chat_id: str = None, config: Dict[str, Any] = None, **kwargs) -> str:
+def _generate_openai(model_name: str, system_prompt: str = None, user_message: str = None, context: str = None, conversation_history: list = None, prompt: str = None, chat_id: str = None, config: Dict[str, Any] = None, stream: bool = False, **kwargs):
     """
     Generate response through OpenAI API with conversation history support.
     
@@ -346,6 +354,13 @@ def _generate_openai(model_name: str, system_prompt: str = None, user_message: s
         generation_params['top_p'] = kwargs['top_p']
     
     # Generate response
+    if stream:
+        response = client.chat.completions.create(stream=True, **generation_params)
+        return (
+            chunk.choices[0].delta.content
+            for chunk in response
+            if chunk.choices and chunk.choices[0].delta.content
+        )
     response = client.chat.completions.create(**generation_params)
     
     return response.choices[0].message.content.strip()
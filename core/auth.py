@@ -3,8 +3,11 @@ JWT-based authentication system for multi-user production.
 Integrated with PostgreSQL database models.
 """
 import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
@@ -27,6 +30,13 @@ SECRET_KEY = os.environ.get("SECRET_KEY", "default-secret-key-change-in-producti
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 7
 
+# Verified tokens: {token: (TokenData, valid_until)}, LRU-bounded.
+# Entries are re-verified after JWT_CACHE_TTL seconds and never outlive the token's exp.
+JWT_CACHE_SIZE = 1024
+JWT_CACHE_TTL = 60
+_jwt_cache: "OrderedDict[str, Tuple[TokenData, float]]" = OrderedDict()
+_jwt_cache_lock = threading.Lock()
+
 
 class Token(BaseModel):
     """JWT Token response model."""
@@ -108,6 +118,15 @@ def decode_access_token(token: str) -> TokenData:
         headers={"WWW-Authenticate": "Bearer"},
     )
     
+    now = time.time()
+    with _jwt_cache_lock:
+        cached = _jwt_cache.get(token)
+        if cached is not None:
+            if now < cached[1]:
+                _jwt_cache.move_to_end(token)
+                return cached[0]
+            del _jwt_cache[token]
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id_str: str = payload.get("sub")
@@ -122,6 +141,12 @@ def decode_access_token(token: str) -> TokenData:
             email=email,
             exp=datetime.fromtimestamp(exp) if exp else None
         )
+        
+        valid_until = min(exp, now + JWT_CACHE_TTL) if exp else now + JWT_CACHE_TTL
+        with _jwt_cache_lock:
+            _jwt_cache[token] = (token_data, valid_until)
+            if len(_jwt_cache) > JWT_CACHE_SIZE:
+                _jwt_cache.popitem(last=False)
         return token_data
         
     except (JWTError, ValueError) as e:
@@ -3,7 +3,7 @@ Response caching for Local Brain.
 Caches AI responses to avoid duplicate API calls.
 """
 import hashlib
-import json
+import orjson
 import time
 from typing import Optional, Dict, Any
 from datetime import datetime, timedelta
@@ -49,10 +49,10 @@ def generate_cache_key(prompt: str, model_name: str, temperature: Optional[float
     }
     
     # Sort keys for consistency
-    params_str = json.dumps(params, sort_keys=True, ensure_ascii=False)
+    params_bytes = orjson.dumps(params, option=orjson.OPT_SORT_KEYS)
     
     # Generate hash
-    cache_key = hashlib.sha256(params_str.encode('utf-8')).hexdigest()
+    cache_key = hashlib.sha256(params_bytes).hexdigest()
     return cache_key
 
 def get_cached_response(cache_key: str, ttl: int = DEFAULT_TTL) -> Optional[str]:
@@ -5,6 +5,7 @@ import os
 import yaml
 from typing import Dict, Any, Optional
 from core.logger import logger
+from core.utils import YamlLoader
 
 _config: Optional[Dict[str, Any]] = None
 
@@ -85,7 +86,7 @@ def load_config(config_path: Optional[str] = None) -> Dict[str, Any]:
     if os.path.exists(config_path):
         try:
             with open(config_path, "r", encoding="utf-8") as f:
-                file_config = yaml.safe_load(f) or {}
+                file_config = yaml.load(f, Loader=YamlLoader) or {}
                 # Merge with default config
                 _config = merge_config(default_config, file_config)
                 logger.info(f"Configuration loaded from {config_path}")
@@ -5,7 +5,7 @@ Replaces file-based history with database storage.
 import os
 from datetime import datetime
 from typing import List, Optional, Dict, Any
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from core.logger import logger
 
@@ -31,15 +31,29 @@ class DatabaseManager:
     def init_db(self):
         """Initialize database connection and create tables."""
         try:
+            from core.settings import settings
+            
             # Create engine
             self.engine = create_engine(
                 self.database_url,
                 pool_pre_ping=True,  # Verify connections before using
-                pool_size=5,
-                max_overflow=10,
+                pool_size=settings.db_pool_size,
+                max_overflow=settings.db_max_overflow,
+                pool_timeout=settings.db_pool_timeout,
+                pool_recycle=settings.db_pool_recycle,  # Drop connections before server-side idle timeouts
                 echo=False  # Set to True for SQL query debugging
             )
             
+            # SQLite (local mode): WAL lets readers run alongside the writer and
+            # turns each commit into a log append; NORMAL only fsyncs at checkpoints
+            if self.database_url.startswith("sqlite"):
+                @event.listens_for(self.engine, "connect")
+                def _set_sqlite_pragmas(dbapi_connection, connection_record):
+                    cursor = dbapi_connection.cursor()
+                    cursor.execute("PRAGMA journal_mode=WAL")
+                    cursor.execute("PRAGMA synchronous=NORMAL")
+                    cursor.close()
+            
             # Create session factory
             self.SessionLocal = sessionmaker(
                 autocommit=False,
@@ -58,6 +72,18 @@ class DatabaseManager:
             # Create tables (after ensuring pgvector extension)
             Base.metadata.create_all(bind=self.engine)
 
+            # create_all does not touch existing tables: add the composite chat index there
+            # and drop the (user_id, chat_id) index it supersedes
+            try:
+                with self.engine.begin() as conn:
+                    conn.exec_driver_sql(
+                        "CREATE INDEX IF NOT EXISTS idx_user_chat_index "
+                        "ON chat_messages (user_id, chat_id, message_index)"
+                    )
+                    conn.exec_driver_sql("DROP INDEX IF EXISTS idx_user_chat")
+            except Exception as idx_e:
+                logger.warning(f"chat_messages index setup skipped: {idx_e}")
+
             # Create semantic index if possible
             try:
                 if self.database_url.startswith("postgresql"):
@@ -71,6 +97,17 @@ class DatabaseManager:
                         )
             except Exception as ext_e:
                 logger.warning(f"pgvector index setup skipped: {ext_e}")
+
+            # Full-text index backing /api/history/search (same expression as the query)
+            try:
+                if self.database_url.startswith("postgresql"):
+                    with self.engine.begin() as conn:
+                        conn.exec_driver_sql(
+                            "CREATE INDEX IF NOT EXISTS idx_chat_messages_content_fts "
+                            "ON chat_messages USING GIN (to_tsvector('simple', content))"
+                        )
+            except Exception as fts_e:
+                logger.warning(f"full-text index setup skipped: {fts_e}")
             
             self._initialized = True
             logger.info("[OK] Database initialized successfully")
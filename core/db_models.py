@@ -5,7 +5,8 @@ Includes User, Archetype models with constraints.
 from datetime import datetime
 from sqlalchemy import (
     Column, String, Integer, DateTime, Text, Boolean, 
-    JSON, ForeignKey, UniqueConstraint, CheckConstraint, Index
+    JSON, ForeignKey, UniqueConstraint, CheckConstraint, Index,
+    func, select
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
@@ -105,11 +106,27 @@ class ChatMessage(Base):
     
     # Indexes for fast queries
     __table_args__ = (
-        Index('idx_user_chat', 'user_id', 'chat_id'),
+        # Chat reads filter on (user_id, chat_id) and order by message_index
+        Index('idx_user_chat_index', 'user_id', 'chat_id', 'message_index'),
         Index('idx_user_created', 'user_id', 'created_at'),
     )
 
 
+def next_index_expr(chat_id: str, user_id: int):
+    """
+    Scalar subquery for the next message_index of a chat (MAX + 1, or 0 for a new chat).
+    
+    Assigned to ChatMessage.message_index it is evaluated inside the INSERT itself,
+    so no separate COUNT/MAX round-trip is needed. Rows added in order see each other.
+    """
+    return select(
+        func.coalesce(func.max(ChatMessage.message_index) + 1, 0)
+    ).where(
+        ChatMessage.chat_id == chat_id,
+        ChatMessage.user_id == user_id
+    ).scalar_subquery()
+
+
 class UserSession(Base):
     """User session model for tracking active sessions."""
     __tablename__ = "user_sessions"
@@ -0,0 +1,83 @@
+"""
+Debounced embedding indexer for Local Brain.
+Collects new chat messages per chat and indexes them in one batch
+once the chat goes idle, instead of embedding on every turn.
+"""
+import asyncio
+from typing import Dict, List, Any, Tuple
+from core.logger import logger
+from core.monitoring import increment_counter
+
+# Seconds a chat must stay idle before its pending messages are indexed
+FLUSH_DELAY = 2.0
+
+# Flush immediately once this many messages are waiting for one chat
+MAX_PENDING = 8
+
+# Pending buffers: {(user_id, chat_id): {"pending": [message_id, ...], "task": asyncio.Task}}
+_buffers: Dict[Tuple[int, str], Dict[str, Any]] = {}
+_buffers_lock = asyncio.Lock()
+
+
+def _index_batch_sync(message_ids: List[int]) -> int:
+    """Embed and store a batch of messages in a single session (runs in a worker thread)."""
+    from core.database import get_db
+    from core.db_models import ChatMessage
+    from core.semantic_search import index_messages
+
+    session_gen = get_db()
+    try:
+        session = next(session_gen)
+        messages = session.query(ChatMessage).filter(ChatMessage.id.in_(message_ids)).all()
+        return index_messages(session, messages)
+    finally:
+        session_gen.close()
+
+
+async def _flush(key: Tuple[int, str]):
+    """Pop the pending batch for a chat and index it."""
+    async with _buffers_lock:
+        entry = _buffers.pop(key, None)
+    if not entry or not entry["pending"]:
+        return
+    try:
+        indexed = await asyncio.to_thread(_index_batch_sync, entry["pending"])
+        increment_counter("vector_db_saves", indexed)
+        logger.debug("Indexed %d/%d messages for chat_id=%s", indexed, len(entry["pending"]), key[1])
+    except Exception as e:
+        increment_counter("vector_db_errors")
+        logger.debug("Batch indexing failed for chat_id=%s: %s", key[1], e)
+
+
+async def _flush_after(key: Tuple[int, str], delay: float):
+    await asyncio.sleep(delay)
+    await _flush(key)
+
+
+async def schedule_index(user_id: int, chat_id: str, message_id: int, delay: float = FLUSH_DELAY):
+    """
+    Queue a saved message for embedding.
+
+    Each call restarts the chat's idle timer; the batch is flushed after
+    `delay` seconds without new messages or once MAX_PENDING are queued.
+    """
+    key = (user_id, chat_id)
+    async with _buffers_lock:
+        entry = _buffers.setdefault(key, {"pending": [], "task": None})
+        entry["pending"].append(message_id)
+        if entry["task"] is not None:
+            entry["task"].cancel()
+        flush_now = len(entry["pending"]) >= MAX_PENDING
+        entry["task"] = asyncio.create_task(_flush_after(key, 0 if flush_now else delay))
+
+
+async def drain():
+    """Flush every pending buffer immediately (used on shutdown)."""
+    async with _buffers_lock:
+        keys = list(_buffers)
+        for key in keys:
+            task = _buffers[key]["task"]
+            if task is not None:
+                task.cancel()
+    for key in keys:
+        await _flush(key)
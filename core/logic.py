@@ -2,7 +2,7 @@ import os
 import sys
 import yaml
 import datetime
-import json
+import orjson
 from dotenv import load_dotenv
 
 # --- Import for AI providers ---
@@ -17,13 +17,17 @@ from core.ai_providers import (
 # --- Import logging and validation ---
 from core.logger import logger
 from core.validation import validate_archetypes_yaml, validate_archetypes_config
-from core.utils import resource_path, get_base_directory
+from core.utils import resource_path, get_base_directory, YamlLoader
 
 # --- Import for vector database search ---
 try:
-    from vector_db.client import search_chats
+    from vector_db.client import search_chats, search_chat_messages, is_vector_db_available
 except ImportError:
     search_chats = None
+    search_chat_messages = None
+
+    def is_vector_db_available() -> bool:
+        return False
 
 # --- Configuration ---
 # Load .env file (use dotenv_values for reliability)
@@ -104,31 +108,50 @@ def reload_archetypes():
     archetype_cache = None
     return load_archetypes()
 
+def resolve_prompt_path(file_path):
+    """Return the first existing location of a prompt file, or None."""
+    if not file_path:
+        return None
+    
+    # Search in various locations (with PyInstaller support)
+    possible_paths = [
+        resource_path(file_path),  # Via resource_path for PyInstaller
+        file_path,  # Absolute or relative path
+        resource_path(os.path.join("prompts", file_path)),  # In prompts folder
+        os.path.join("prompts", file_path),  # In prompts folder (normal mode)
+        os.path.join(os.path.dirname(__file__), "..", "prompts", file_path),
+        os.path.join(os.path.dirname(__file__), "..", file_path),
+    ]
+    
+    for path in possible_paths:
+        if path and os.path.exists(path):
+            return path
+    return None
+
+# Prompt file contents: {path: (mtime_ns, content)}
+_prompt_file_cache = {}
+
 def load_prompt_file(file_path):
-    """Load prompt from file."""
+    """Load prompt from file, rereading it only when its mtime changes."""
     if not file_path:
         return None
     
     try:
-        # Search in various locations (with PyInstaller support)
-        possible_paths = [
-            resource_path(file_path),  # Via resource_path for PyInstaller
-            file_path,  # Absolute or relative path
-            resource_path(os.path.join("prompts", file_path)),  # In prompts folder
-            os.path.join("prompts", file_path),  # In prompts folder (normal mode)
-            os.path.join(os.path.dirname(__file__), "..", "prompts", file_path),
-            os.path.join(os.path.dirname(__file__), "..", file_path),
-        ]
+        path = resolve_prompt_path(file_path)
+        if path is None:
+            logger.warning(f"Prompt file not found: {file_path}")
+            return None
         
-        for path in possible_paths:
-            if path and os.path.exists(path):
-                with open(path, "r", encoding="utf-8") as f:
-                    content = f.read().strip()
-                    logger.debug(f"Loaded prompt file: {path} ({len(content)} chars)")
-                    return content
+        mtime = os.stat(path).st_mtime_ns
+        cached = _prompt_file_cache.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
         
-        logger.warning(f"Prompt file not found: {file_path}")
-        return None
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        logger.debug(f"Loaded prompt file: {path} ({len(content)} chars)")
+        _prompt_file_cache[path] = (mtime, content)
+        return content
     except Exception as e:
         logger.warning(f"Failed to load prompt file '{file_path}': {e}", exc_info=True)
         return None
@@ -224,7 +247,7 @@ def load_archetypes():
                 logger.warning(f"archetypes.yaml: {warning}")
         
         with open(archetypes_path, "r", encoding="utf-8") as f:
-            archetype_cache = yaml.safe_load(f)
+            archetype_cache = yaml.load(f, Loader=YamlLoader)
         
         # Validate configuration structure
         config_valid, config_errors = validate_archetypes_config(archetype_cache)
@@ -270,13 +293,27 @@ def log_interaction(archetype_name, user_text, final_prompt, response):
             "full_prompt_sent_to_model": final_prompt,
             "model_response": response,
         }
-        with open(filename, "w", encoding="utf-8") as f:
-            json.dump(log_data, f, ensure_ascii=False, indent=4)
+        with open(filename, "wb") as f:
+            f.write(orjson.dumps(log_data))
         logger.debug(f"Interaction saved to {filename}")
     except Exception as e:
         logger.error(f"Failed to save interaction log: {e}", exc_info=True)
 
-def process_with_archetype(text: str, archetype_name: str, archetypes: dict, chat_history=None, chat_id=None, user_id=None, **kwargs):
+def _cache_stream(chunks, cache_key):
+    """Yield response chunks and cache the full text once the stream completes."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    if cache_key:
+        try:
+            from core.cache import cache_response, DEFAULT_TTL
+            cache_response(cache_key, "".join(parts), ttl=DEFAULT_TTL)
+        except Exception as cache_error:
+            logger.debug("Cache save failed: %s", cache_error)
+
+
+def process_with_archetype(text: str, archetype_name: str, archetypes: dict, chat_history=None, chat_id=None, user_id=None, stream=False, **kwargs):
     """
     Form prompt, pull relevant context from vector database,
     select appropriate model, generate response and log result.
@@ -288,11 +325,12 @@ def process_with_archetype(text: str, archetype_name: str, archetypes: dict, cha
         chat_history: List of previous messages (deprecated - used for file-based history only)
         chat_id: ID of current chat for vector database search
         user_id: User ID for multi-user database filtering
+        stream: If True, the result holds an iterator of response chunks under "stream"
         **kwargs: Additional parameters (temperature, max_tokens, top_p, top_k)
     """
     if chat_history is None:
         chat_history = []
-    logger.debug(f"Processing request for archetype '{archetype_name}', chat_id={chat_id}, user_id={user_id}")
+    logger.debug("Processing request for archetype '%s', chat_id=%s, user_id=%s", archetype_name, chat_id, user_id)
     
     if not text or not archetype_name:
         error_msg = "Text and archetype must be specified."
@@ -332,78 +370,72 @@ def process_with_archetype(text: str, archetype_name: str, archetypes: dict, cha
     # Maximum number of recent messages to include (sliding window)
     MAX_RECENT_MESSAGES = 3  # Last 3 exchanges (6 messages: 3 user + 3 assistant)
     
-    # Try to import vector DB functions
-    try:
-        from vector_db.client import search_chat_messages, search_chats, is_vector_db_available
-        
-        if is_vector_db_available() and user_id is not None:
-            # 1. Search for relevant messages in CURRENT chat (for continuity)
-            if chat_id:
-                try:
-                    relevant_messages = search_chat_messages(chat_id, text, n_results=3, user_id=user_id)
-                    if relevant_messages:
-                        # Sort by score (distance) - lower is better
-                        relevant_messages.sort(key=lambda x: x.get("score", float("inf")))
-                        context_messages = relevant_messages
-                        logger.debug(f"Found {len(relevant_messages)} relevant messages in current chat")
-                except Exception as e:
-                    logger.warning(f"Failed to search messages in current chat: {e}")
-            
-            # 2. Search for relevant chats from ENTIRE database (for broader context)
-            # This includes both chat conversations and uploaded files
+    # Vector DB functions are imported once at module load
+    if is_vector_db_available() and user_id is not None:
+        # 1. Search for relevant messages in CURRENT chat (for continuity)
+        if chat_id:
             try:
-                # Search across all chats and files (excluding current chat if chat_id exists)
-                relevant_chats = search_chats(text, n_results=3, user_id=user_id)
-                if relevant_chats:
-                    # Filter out current chat if it appears in results
-                    if chat_id:
-                        relevant_chats = [c for c in relevant_chats if c.get("chat_id") != chat_id]
-                    
+                relevant_messages = search_chat_messages(chat_id, text, n_results=3, user_id=user_id)
+                if relevant_messages:
                     # Sort by score (distance) - lower is better
-                    relevant_chats.sort(key=lambda x: x.get("score", float("inf")))
-                    context_chats = relevant_chats[:2]  # Take top 2 most relevant
-                    logger.debug(f"Found {len(context_chats)} relevant chats/files from entire database")
+                    relevant_messages.sort(key=lambda x: x.get("score", float("inf")))
+                    context_messages = relevant_messages
+                    logger.debug("Found %d relevant messages in current chat", len(relevant_messages))
             except Exception as e:
-                logger.warning(f"Failed to search chats in database: {e}")
-        elif user_id is None:
-            logger.warning("user_id is None, skipping vector DB search for multi-user isolation")
-            
-        else:
-            logger.debug("Vector database not available, skipping context retrieval")
-            
-            # Combine context from current chat and other chats
-            context_parts = []
-            
-            # Add context from current chat
-            if context_messages:
-                current_chat_parts = []
-                for msg in context_messages[:3]:  # Top 3 from current chat
-                    role_label = "User" if msg.get("role") == "user" else "Assistant"
-                    current_chat_parts.append(f"{role_label}: {msg.get('text', '')}")
-                if current_chat_parts:
-                    context_parts.append("Relevant context from this conversation:\n" + "\n\n".join(current_chat_parts))
-            
-            # Add context from other chats
-            if context_chats:
-                other_chats_parts = []
-                for chat in context_chats:
-                    chat_text = chat.get("text", "")
-                    # Truncate long chats to avoid token explosion
-                    if len(chat_text) > 500:
-                        chat_text = chat_text[:500] + "..."
-                    other_chats_parts.append(f"From previous chat ({chat.get('chat_id', 'unknown')}):\n{chat_text}")
-                if other_chats_parts:
-                    context_parts.append("Relevant context from previous conversations:\n" + "\n\n".join(other_chats_parts))
-            
-            if context_parts:
-                context = "\n\n".join(context_parts)
-                logger.debug(f"Combined context: {len(context_messages)} messages from current chat, {len(context_chats)} chats from database")
-    except ImportError:
-        # Vector DB not available, skip context search
-        pass
+                logger.warning(f"Failed to search messages in current chat: {e}")
+        
+        # 2. Search for relevant chats from ENTIRE database (for broader context)
+        # This includes both chat conversations and uploaded files
+        try:
+            # Search across all chats and files (excluding current chat if chat_id exists)
+            relevant_chats = search_chats(text, n_results=3, user_id=user_id)
+            if relevant_chats:
+                # Filter out current chat if it appears in results
+                if chat_id:
+                    relevant_chats = [c for c in relevant_chats if c.get("chat_id") != chat_id]
+                
+                # Sort by score (distance) - lower is better
+                relevant_chats.sort(key=lambda x: x.get("score", float("inf")))
+                context_chats = relevant_chats[:2]  # Take top 2 most relevant
+                logger.debug("Found %d relevant chats/files from entire database", len(context_chats))
+        except Exception as e:
+            logger.warning(f"Failed to search chats in database: {e}")
+    elif user_id is None:
+        logger.warning("user_id is None, skipping vector DB search for multi-user isolation")
+        
+    else:
+        logger.debug("Vector database not available, skipping context retrieval")
+        
+        # Combine context from current chat and other chats
+        context_parts = []
+        
+        # Add context from current chat
+        if context_messages:
+            current_chat_parts = []
+            for msg in context_messages[:3]:  # Top 3 from current chat
+                role_label = "User" if msg.get("role") == "user" else "Assistant"
+                current_chat_parts.append(f"{role_label}: {msg.get('text', '')}")
+            if current_chat_parts:
+                context_parts.append("Relevant context from this conversation:\n" + "\n\n".join(current_chat_parts))
+        
+        # Add context from other chats
+        if context_chats:
+            other_chats_parts = []
+            for chat in context_chats:
+                chat_text = chat.get("text", "")
+                # Truncate long chats to avoid token explosion
+                if len(chat_text) > 500:
+                    chat_text = chat_text[:500] + "..."
+                other_chats_parts.append(f"From previous chat ({chat.get('chat_id', 'unknown')}):\n{chat_text}")
+            if other_chats_parts:
+                context_parts.append("Relevant context from previous conversations:\n" + "\n\n".join(other_chats_parts))
+        
+        if context_parts:
+            context = "\n\n".join(context_parts)
+            logger.debug("Combined context: %d messages from current chat, %d chats from database", len(context_messages), len(context_chats))
     
     # Get recent messages for sliding window (from file-based history)
-    if chat_history and len(chat_history) > 0:
+    if chat_history:
         # Take last MAX_RECENT_MESSAGES exchanges
         recent_history = chat_history[-MAX_RECENT_MESSAGES:]
         recent_messages = []
@@ -419,10 +451,10 @@ def process_with_archetype(text: str, archetype_name: str, archetypes: dict, cha
                     "role": "model",
                     "content": entry["model_response"]
                 })
-        logger.debug(f"Using {len(recent_messages)} recent messages for sliding window")
+        logger.debug("Using %d recent messages for sliding window", len(recent_messages))
 
     full_prompt = f"{system_prompt}\n\n{context}\n\nUser query:\n{text}" if context else f"{system_prompt}\n\nUser query:\n{text}"
-    logger.debug(f"Full prompt length: {len(full_prompt)} characters")
+    logger.debug("Full prompt length: %d characters", len(full_prompt))
 
     # Get model parameters: use kwargs if provided, otherwise use archetype config, otherwise use defaults
     # Use 'in' check to allow 0.0 values (which would be False with 'or')
@@ -442,13 +474,13 @@ def process_with_archetype(text: str, archetype_name: str, archetypes: dict, cha
     elif 'top_k' in archetype_config:
         model_params['top_k'] = archetype_config['top_k']
     
-    logger.debug(f"Model parameters: {model_params}")
+    logger.debug("Model parameters: %s", model_params)
 
     try:
         # Normalize model name for current provider
         provider = get_current_provider()
         normalized_model = normalize_model_name(model_name, provider)
-        logger.debug(f"Using model: {normalized_model} (provider: {provider.value})")
+        logger.debug("Using model: %s (provider: %s)", normalized_model, provider.value)
         
         # Initialize cache_key variable
         cache_key = None
@@ -473,11 +505,11 @@ def process_with_archetype(text: str, archetype_name: str, archetypes: dict, cha
                 # Try to get cached response
                 cached_response = get_cached_response(cache_key, ttl=DEFAULT_TTL)
                 if cached_response:
-                    logger.info(f"Cache hit for archetype '{archetype_name}' ({len(cached_response)} chars)")
+                    logger.info("Cache hit for archetype '%s' (%d chars)", archetype_name, len(cached_response))
                     return {"response": cached_response, "cached": True}
             except Exception as cache_error:
                 # If caching fails, continue without cache
-                logger.debug(f"Cache check failed: {cache_error}")
+                logger.debug("Cache check failed: %s", cache_error)
         
         # Use sliding window: only last N messages + relevant context from vector DB
         # This prevents token explosion while maintaining context
@@ -492,9 +524,13 @@ def process_with_archetype(text: str, archetype_name: str, archetypes: dict, cha
             context=context,
             conversation_history=conversation_history,
             chat_id=chat_id,
+            stream=stream,
             **model_params
         )
-        logger.info(f"Successfully generated response for archetype '{archetype_name}' ({len(model_response)} chars)")
+        if stream:
+            logger.info("Streaming response for archetype '%s'", archetype_name)
+            return {"stream": _cache_stream(model_response, cache_key), "cached": False}
+        logger.info("Successfully generated response for archetype '%s' (%d chars)", archetype_name, len(model_response))
         
         # Cache the response (if cache_key was generated)
         if cache_key:
@@ -502,11 +538,11 @@ def process_with_archetype(text: str, archetype_name: str, archetypes: dict, cha
                 from core.cache import cache_response, DEFAULT_TTL
                 cache_response(cache_key, model_response, ttl=DEFAULT_TTL)
             except Exception as cache_error:
-                logger.debug(f"Cache save failed: {cache_error}")
+                logger.debug("Cache save failed: %s", cache_error)
         
         # Note: Vector DB save removed - using PostgreSQL instead (in main.py)
         # ChromaDB requires persistent volumes which are not available on free Railway plan
-        logger.debug(f"✅ Response generated (vector DB save handled in main.py via PostgreSQL)")
+        logger.debug("✅ Response generated (vector DB save handled in main.py via PostgreSQL)")
         
         # Note: Interaction logging is handled in main.py to avoid duplicate files
         # log_interaction is kept for backward compatibility but not called here
@@ -1,10 +1,12 @@
 """
 Monitoring and metrics for Local Brain.
 """
+import threading
 import time
+from contextvars import ContextVar
 from datetime import datetime
-from typing import Dict, List, Optional
-from collections import defaultdict
+from typing import Dict, List, Mapping, Optional
+from collections import Counter, defaultdict
 from core.logger import logger
 
 # Metrics storage
@@ -12,17 +14,79 @@ _metrics: Dict[str, List[Dict]] = defaultdict(list)
 _counters: Dict[str, int] = defaultdict(int)
 _timers: Dict[str, List[float]] = defaultdict(list)
 
+# Counters are also bumped from worker threads
+_counters_lock = threading.Lock()
+
+
+class _CounterBatch:
+    """Counter increments collected while one request is being handled."""
+    __slots__ = ("counts", "open")
+
+    def __init__(self):
+        self.counts = Counter()
+        self.open = True
+
+
+# Batch of the request currently being handled (set by CounterBatchMiddleware)
+_pending_counters: ContextVar[Optional[_CounterBatch]] = ContextVar("pending_counters", default=None)
+
+
 def increment_counter(name: str, value: int = 1):
     """
     Increment a counter metric.
     
+    Inside a request wrapped by CounterBatchMiddleware the increment is buffered
+    and applied together with the request's other counters when it finishes.
+    
     Args:
         name: Counter name
         value: Value to increment by
     """
-    _counters[name] += value
+    batch = _pending_counters.get()
+    if batch is not None and batch.open:
+        batch.counts[name] += value
+        return
+    with _counters_lock:
+        _counters[name] += value
     logger.debug(f"Counter '{name}' incremented by {value}, current value: {_counters[name]}")
 
+def increment_counters(counts: Mapping[str, int]):
+    """
+    Increment several counter metrics at once under a single lock acquisition.
+    
+    Args:
+        counts: Mapping of counter name to increment
+    """
+    if not counts:
+        return
+    with _counters_lock:
+        for name, value in counts.items():
+            _counters[name] += value
+    logger.debug(f"Counters incremented: {dict(counts)}")
+
+class CounterBatchMiddleware:
+    """
+    ASGI middleware applying all counter increments of a request in one locked update.
+    
+    Tasks spawned by the request that outlive it (e.g. debounced indexing) find the
+    batch closed and fall back to immediate increments.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        batch = _CounterBatch()
+        token = _pending_counters.set(batch)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            batch.open = False
+            _pending_counters.reset(token)
+            increment_counters(batch.counts)
+
 def record_timer(name: str, duration: float):
     """
     Record a timer metric.
@@ -50,6 +50,39 @@ def index_message(session: Session, msg: ChatMessage) -> bool:
         return False
 
 
+def index_messages(session: Session, messages: List[ChatMessage]) -> int:
+    """Compute and store embeddings for several messages with a single commit.
+
+    Returns:
+        Number of messages indexed.
+    """
+    indexed = 0
+    try:
+        for msg in messages:
+            if msg.role not in message_roles_to_index:
+                continue
+            vec = embed_text(msg.content)
+            if not vec or len(vec) != EMBED_DIM:
+                continue
+            # Remove existing embedding for this message to avoid duplicates
+            session.query(ChatEmbedding).filter(ChatEmbedding.message_id == msg.id).delete()
+            session.add(ChatEmbedding(
+                user_id=msg.user_id,
+                chat_id=msg.chat_id,
+                message_id=msg.id,
+                role=msg.role,
+                content=msg.content,
+                embedding=vec,
+            ))
+            indexed += 1
+        session.commit()
+        return indexed
+    except Exception as e:
+        session.rollback()
+        logger.debug(f"Embedding batch index error: {e}")
+        return 0
+
+
 def index_latest_assistant(session: Session, user_id: int, chat_id: str) -> bool:
     try:
         msg = (
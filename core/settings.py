@@ -76,6 +76,12 @@ class Settings(BaseSettings):
         print(f"⚠️  No valid PostgreSQL config found, using SQLite")
         return "sqlite:///./brainai.db"
     
+    # Connection pool per worker process (PgBouncer on :6432 in front of Postgres for more fan-in)
+    db_pool_size: int = Field(default=20, alias="DB_POOL_SIZE")
+    db_max_overflow: int = Field(default=10, alias="DB_MAX_OVERFLOW")
+    db_pool_timeout: int = Field(default=30, alias="DB_POOL_TIMEOUT")
+    db_pool_recycle: int = Field(default=3600, alias="DB_POOL_RECYCLE")
+    
     # === AI Provider Settings ===
     ai_provider: str = Field(default="google_ai", alias="AI_PROVIDER")
     google_api_key: Optional[str] = Field(default=None, alias="GOOGLE_API_KEY")
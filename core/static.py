@@ -0,0 +1,24 @@
+"""
+Static file serving for Local Brain.
+Shared by main.py and main_production.py so both apps send the same caching headers.
+"""
+import re
+
+from fastapi.staticfiles import StaticFiles
+
+
+# Fingerprinted assets (e.g. app.3f9a1c2b.js) never change under the same name
+_HASHED_ASSET_RE = re.compile(r"\.[0-9a-f]{8,}\.[A-Za-z0-9]+$")
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that adds Cache-Control on top of Starlette's ETag/304 handling."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if _HASHED_ASSET_RE.search(str(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        else:
+            # Unversioned names must be revalidated soon; the ETag keeps that a 304
+            response.headers["Cache-Control"] = "public, max-age=300"
+        return response
@@ -4,6 +4,29 @@ Common functions used across the project.
 """
 import os
 import sys
+import tempfile
+
+try:
+    # libyaml C extension: several times faster than the pure-Python loader/dumper
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as YamlDumper
+
+
+# Resolved once at import: the PyInstaller attributes never change at runtime,
+# and entry points set the working directory before importing the app.
+if hasattr(sys, '_MEIPASS'):
+    # PyInstaller creates temporary folder in _MEIPASS
+    RESOURCE_BASE = sys._MEIPASS
+    # PyInstaller: search next to exe file
+    if getattr(sys, 'frozen', False):
+        BASE_DIRECTORY = os.path.dirname(sys.executable)
+    else:
+        BASE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+else:
+    # Normal mode - use current directory
+    RESOURCE_BASE = os.path.abspath(".")
+    BASE_DIRECTORY = os.getcwd()
 
 
 def resource_path(relative_path: str) -> str:
@@ -16,13 +39,7 @@ def resource_path(relative_path: str) -> str:
     Returns:
         Absolute path to resource
     """
-    if hasattr(sys, '_MEIPASS'):
-        # PyInstaller creates temporary folder in _MEIPASS
-        base_path = sys._MEIPASS
-    else:
-        # Normal mode - use current directory
-        base_path = os.path.abspath(".")
-    return os.path.join(base_path, relative_path)
+    return os.path.join(RESOURCE_BASE, relative_path)
 
 
 def get_base_directory() -> str:
@@ -32,14 +49,7 @@ def get_base_directory() -> str:
     Returns:
         Base directory path
     """
-    if hasattr(sys, '_MEIPASS'):
-        # PyInstaller: search next to exe file
-        if getattr(sys, 'frozen', False):
-            return os.path.dirname(sys.executable)
-        else:
-            return os.path.dirname(os.path.abspath(__file__))
-    else:
-        return os.getcwd()
+    return BASE_DIRECTORY
 
 
 def get_base_dir() -> str:
@@ -52,5 +62,40 @@ def get_base_dir() -> str:
     return get_base_directory()
 
 
+# Process umask, read once at import (os.umask can only be queried by setting it,
+# which is not safe to do from the worker threads that call atomic_write_text)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
 
 
+def atomic_write_text(path: str, content: str) -> None:
+    """
+    Write a text file atomically: write to a temp file, then os.replace it.
+    
+    Readers never see a half-written file, and a crash leaves the old one intact.
+    An existing file keeps its permission bits (e.g. a 0600 .env stays 0600).
+    
+    Args:
+        path: Destination file path
+        content: Text to write (UTF-8)
+    """
+    # Unique temp file in the target directory so concurrent saves never share it
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            # mkstemp creates the file 0600; give it the old file's mode (or the umask default)
+            try:
+                mode = os.stat(path).st_mode & 0o7777
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+            os.chmod(tmp_path, mode)
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
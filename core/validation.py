@@ -7,6 +7,7 @@ from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 from pydantic import BaseModel, Field, ValidationError, field_validator
 from core.logger import logger
+from core.utils import YamlLoader
 
 class ArchetypeConfig(BaseModel):
     """Pydantic model for archetype configuration validation."""
@@ -203,7 +204,7 @@ def validate_archetypes_yaml(yaml_path: str) -> Tuple[bool, List[str], List[str]
     
     try:
         with open(yaml_path, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+            config = yaml.load(f, Loader=YamlLoader)
         
         if config is None:
             errors.append("archetypes.yaml is empty")
@@ -1,11 +1,19 @@
 import os
 import sys
-import json
+import asyncio
+import hashlib
+import re
+import signal
+import tempfile
 import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from typing import List, Optional
 from fastapi import FastAPI, Request, HTTPException, UploadFile, File, Depends
-from fastapi.responses import HTMLResponse, JSONResponse, FileResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse, ORJSONResponse
 
 # TODO: Refactor to modular router structure
 # See REFACTORING_GUIDE.md for migration plan
@@ -13,6 +21,7 @@ from fastapi.staticfiles import StaticFiles
 
 # File upload validation constants
 MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # uploads are copied to disk 1MB at a time
 ALLOWED_MIME_TYPES = [
     "text/plain",
     "text/markdown",
@@ -23,10 +32,12 @@ ALLOWED_MIME_TYPES = [
     "application/json"
 ]
 from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
+from starlette.background import BackgroundTask
 from sqlalchemy.orm import Session
-from core.logic import load_archetypes, process_with_archetype, reload_archetypes
+from core.logic import load_archetypes, process_with_archetype, reload_archetypes, load_prompt_file, resolve_prompt_path
 from core.ai_providers import (
     get_current_provider, 
     get_provider_config, 
@@ -40,18 +51,49 @@ from core.validation import validate_archetypes_config, validate_env_file
 from core.i18n import get_user_language, t, SUPPORTED_LANGUAGES, DEFAULT_LANGUAGE
 from core.monitoring import (
     increment_counter, record_timer, record_metric,
-    get_metrics_summary, TimerContext, reset_metrics
+    get_metrics_summary, TimerContext, reset_metrics, CounterBatchMiddleware
 )
-from core.utils import resource_path, get_base_directory
+from core.static import CachedStaticFiles
+from core.utils import resource_path, get_base_directory, YamlLoader, YamlDumper, atomic_write_text
 from conferences.rada import router as rada_router
 from core.auth_routes import router as auth_router
 from core.auth import decode_access_token, get_current_user_id, get_current_user_id_optional
 from core.database import get_db
-import aiofiles
+from core.db_models import ChatMessage, ChatEmbedding, next_index_expr
+from core.cache import (
+    get_cache_stats, reset_cache_stats, clear_cache,
+    clear_expired_entries, DEFAULT_TTL
+)
+from sqlalchemy import and_, delete, distinct, func, insert, select
+from dotenv import dotenv_values
+import aiofiles.os
+import orjson
 import yaml
 import shutil
 from datetime import datetime
-from core.semantic_search import index_message, search_semantic, is_pgvector_enabled
+from core.semantic_search import search_semantic, is_pgvector_enabled, reindex_embeddings
+from core.index_queue import schedule_index, drain as drain_index_queue
+
+# --- Legacy vector database client (imported once, shared by all handlers) ---
+try:
+    from vector_db.client import delete_chat, is_vector_db_available
+except ImportError:
+    delete_chat = None
+
+    def is_vector_db_available() -> bool:
+        return False
+
+# --- File processing (docx/pdf readers are imported lazily inside the module) ---
+try:
+    from core import file_processor
+except ImportError:
+    file_processor = None
+
+def get_file_processor():
+    """Dependency: the file processing module, resolved once at import time."""
+    if file_processor is None:
+        raise HTTPException(status_code=500, detail="File processing module not available")
+    return file_processor
 
 # Global variable to store server object (for graceful shutdown)
 _server_instance: Optional[object] = None
@@ -67,37 +109,54 @@ def set_shutdown_event(event):
     global _shutdown_event
     _shutdown_event = event
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Prerender the main page on startup; flush debounced background work before the server exits."""
+    try:
+        # Compiles index.html (or loads its bytecode) before the first visitor arrives
+        for language in SUPPORTED_LANGUAGES:
+            await asyncio.to_thread(render_index_page, language)
+    except Exception as e:
+        logger.warning(f"Could not prerender the main page: {e}")
+    yield
+    await drain_index_queue()
+
 app = FastAPI(
     title="BrainAi",
     description="Intelligent local AI assistant with multiple agents and vector database support",
     version="1.0.0",
     docs_url="/docs",  # Swagger UI at /docs
     redoc_url="/redoc",  # ReDoc at /redoc
-    openapi_url="/openapi.json"  # OpenAPI schema at /openapi.json
+    openapi_url="/openapi.json",  # OpenAPI schema at /openapi.json
+    default_response_class=ORJSONResponse,  # orjson for endpoints returning plain dicts/lists
+    lifespan=lifespan
 )
 
+# Public route prefixes that don't require authentication
+# (a tuple so str.startswith checks all of them in one call)
+PUBLIC_ROUTE_PREFIXES = (
+    "/", "/docs", "/redoc", "/openapi.json",
+    "/static", "/health", "/favicon.ico",
+    "/api/auth/register", "/api/auth/login",
+    "/process"  # Temporarily public during migration
+)
+BEARER_PREFIX = "Bearer "
+
+
 # JWT Authentication Middleware
 class AuthMiddleware(BaseHTTPMiddleware):
     """Middleware to optionally extract user_id from JWT token."""
     
     async def dispatch(self, request: Request, call_next):
-        # Public routes that don't require authentication
-        public_routes = [
-            "/", "/docs", "/redoc", "/openapi.json",
-            "/static", "/health", "/favicon.ico",
-            "/api/auth/register", "/api/auth/login",
-            "/process"  # Temporarily public during migration
-        ]
-        
         # Check if route is public
         path = request.url.path
-        is_public = any(path.startswith(route) for route in public_routes)
+        is_public = path.startswith(PUBLIC_ROUTE_PREFIXES)
         
         # Extract user_id from token if present (but don't block if missing on public routes)
         user_id = None
         auth_header = request.headers.get("authorization")
-        if auth_header and auth_header.startswith("Bearer "):
-            token = auth_header.replace("Bearer ", "")
+        if auth_header and auth_header.startswith(BEARER_PREFIX):
+            token = auth_header[len(BEARER_PREFIX):]
             try:
                 token_data = decode_access_token(token)
                 user_id = token_data.user_id
@@ -106,19 +165,19 @@ class AuthMiddleware(BaseHTTPMiddleware):
                 # Invalid token - only fail on protected routes
                 if not is_public:
                     logger.warning(f"Invalid token on protected route: {e}")
-                    return Response(
-                        content=json.dumps({"detail": "Invalid or expired token"}),
-                        status_code=401,
-                        media_type="application/json"
+                    return ORJSONResponse(
+                        content={"detail": "Invalid or expired token"},
+                        status_code=401
                     )
                 else:
-                    logger.debug(f"Invalid token on public route, continuing without auth: {e}")
+                    logger.debug("Invalid token on public route, continuing without auth: %s", e)
         
         response = await call_next(request)
         return response
 
 # Add middleware
 app.add_middleware(AuthMiddleware)
+app.add_middleware(CounterBatchMiddleware)  # one counters update per request
 
 # Include routers
 app.include_router(rada_router)
@@ -130,9 +189,19 @@ logger.info("Starting BrainAi application")
 # Use resource_path for static files and templates
 static_dir = resource_path("static")
 templates_dir = resource_path("templates")
-
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
-templates = Jinja2Templates(directory=templates_dir)
+FAVICON_PATH = resource_path(os.path.join("static", "favicon.ico"))
+
+app.mount("/static", CachedStaticFiles(directory=static_dir, html=False), name="static")
+# Templates ship with the app and never change while it runs: skip the
+# per-render mtime check and keep compiled bytecode across restarts
+JINJA_CACHE_DIR = os.path.join(tempfile.gettempdir(), "brainai-jinja")
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+templates = Jinja2Templates(env=Environment(
+    loader=FileSystemLoader(templates_dir),
+    autoescape=True,
+    auto_reload=False,
+    bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR),
+))
 
 # For history, use directory next to exe file (not in _MEIPASS)
 if hasattr(sys, '_MEIPASS'):
@@ -149,28 +218,288 @@ else:
 
 HISTORY_DIR = os.path.join(base_dir, "history")
 os.makedirs(HISTORY_DIR, exist_ok=True)
+# Absolute history path with trailing separator, resolved once; filenames are
+# validated by _BAD_FILENAME_RE so handlers can join without re-resolving.
+HISTORY_DIR_ABS = os.path.abspath(HISTORY_DIR) + os.sep
+
+# Rejects path separators, NUL bytes, parent-directory references and hidden
+# (dot-prefixed) names in history filenames with a single scan
+_BAD_FILENAME_RE = re.compile(r"^\.|[\\/\x00]|\.\.")
 
 UPLOAD_DIR = os.path.join(base_dir, "uploads")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-archetypes = load_archetypes()
+# Config locations are fixed for the process lifetime; resolve them once
+ARCHETYPES_YAML_PATH = os.path.join(get_base_directory(), "archetypes.yaml")
+PROMPTS_DIR = os.path.join(get_base_directory(), "prompts")
+os.makedirs(PROMPTS_DIR, exist_ok=True)
+ENV_PATH = os.path.join(base_dir, ".env")
+
+# Loaded archetypes as a (generation, dict) pair. The dict is never mutated:
+# requests take one snapshot and use it throughout, and a save swaps in a new
+# pair, so a reload can never be observed half-way through a request.
+_archetypes_state = (0, load_archetypes())
+_archetypes_swap_lock = threading.Lock()
+
+def archetypes_snapshot() -> tuple:
+    """Return the current (generation, archetypes) pair."""
+    return _archetypes_state
+
+def replace_archetypes(new_archetypes: dict):
+    """Publish a freshly loaded archetypes dict under a new generation."""
+    global _archetypes_state
+    with _archetypes_swap_lock:
+        _archetypes_state = (_archetypes_state[0] + 1, new_archetypes)
+
+# Rendered index page per language: {language: (archetypes generation, html bytes)}.
+# The page only depends on the archetypes dict, so it is re-rendered when a new
+# generation is published (e.g. after saving the configuration).
+_index_page_cache = {}
+
+def render_index_page(language: str) -> bytes:
+    """Return the rendered main page, rendering it only when archetypes change."""
+    generation, archetypes = archetypes_snapshot()
+    cached = _index_page_cache.get(language)
+    if cached is not None and cached[0] == generation:
+        return cached[1]
+    html = templates.get_template("index.html").render(
+        archetypes=archetypes,
+        language=language,
+        supported_languages=SUPPORTED_LANGUAGES
+    ).encode("utf-8")
+    _index_page_cache[language] = (generation, html)
+    return html
 
 @app.get("/", response_class=HTMLResponse)
 async def read_root(request: Request):
     """Main page with chat interface."""
     language = get_user_language(request)
     increment_counter("page_views")
-    return templates.TemplateResponse(
-        "index.html", {
-            "request": request,
-            "archetypes": archetypes,
-            "language": language,
-            "supported_languages": SUPPORTED_LANGUAGES
-        }
-    )
+    return HTMLResponse(content=render_index_page(language))
+
+def body_etag(body: bytes) -> str:
+    """Strong ETag derived from a response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+def with_etag(request: Request, response: Response, etag: Optional[str] = None) -> Response:
+    """Attach an ETag (content hash unless given) to response; return 304 if the client already has it."""
+    if etag is None:
+        etag = body_etag(response.body)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    # Polled by the UI: always revalidate, which the ETag turns into a cheap 304
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# Sorted history listing keyed by the directory mtime (bumped on create/unlink)
+_history_list_cache = {"mtime": None, "files": []}
+
+def list_history_files() -> List[str]:
+    """Return legacy history file names (newest first by name) using a single scandir pass.
+
+    The result is reused while the directory mtime is unchanged; treat it as read-only.
+    """
+    mtime = os.stat(HISTORY_DIR).st_mtime_ns
+    if _history_list_cache["mtime"] == mtime:
+        return _history_list_cache["files"]
+    with os.scandir(HISTORY_DIR) as it:
+        files = [e.name for e in it if e.name.endswith('.json') and e.is_file()]
+    files.sort(reverse=True)
+    _history_list_cache["mtime"] = mtime
+    _history_list_cache["files"] = files
+    return files
+
+# Small LRU of raw history file bytes keyed by (name, mtime_ns, size) so that
+# repeated exports of the same chat skip the disk read
+HISTORY_CACHE_MAX = 64
+_history_file_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+
+def _read_file_bytes(path: str) -> bytes:
+    """Read a whole file synchronously (run via asyncio.to_thread)."""
+    with open(path, "rb") as f:
+        return f.read()
+
+def _read_history_file_sync(filepath: str, filename: str):
+    """Stat a history file and read it only if the cached copy is stale.
+
+    Runs in one worker thread hop; returns (cache_key, bytes or None on cache hit).
+    """
+    with open(filepath, "rb") as f:
+        st = os.fstat(f.fileno())
+        key = (filename, st.st_mtime_ns, st.st_size)
+        if key in _history_file_cache:
+            return key, None
+        return key, f.read()
+
+async def read_history_file(filename: str) -> bytes:
+    """Read a history file as bytes, serving unchanged files from the LRU cache.
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    filepath = os.path.join(HISTORY_DIR_ABS, filename)
+    key, raw = await asyncio.to_thread(_read_history_file_sync, filepath, filename)
+    if raw is None:
+        cached = _history_file_cache.get(key)
+        if cached is not None:
+            _history_file_cache.move_to_end(key)
+            return cached
+        # Evicted between the check and now; fall back to a plain read
+        raw = await asyncio.to_thread(_read_file_bytes, filepath)
+    _history_file_cache[key] = raw
+    if len(_history_file_cache) > HISTORY_CACHE_MAX:
+        _history_file_cache.popitem(last=False)
+    return raw
+
+# Per-chat write locks; entries disappear once no request holds them
+_chat_write_locks: "weakref.WeakValueDictionary[tuple, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+def chat_write_lock(user_id: int, chat_id: str) -> asyncio.Lock:
+    """Return the asyncio.Lock guarding writes to one user's chat."""
+    key = (user_id, chat_id)
+    lock = _chat_write_locks.get(key)
+    if lock is None:
+        lock = asyncio.Lock()
+        _chat_write_locks[key] = lock
+    return lock
+
+def parse_model_params(data: dict) -> dict:
+    """Extract optional model parameters from a /process request body."""
+    model_params = {}
+    if 'temperature' in data:
+        model_params['temperature'] = float(data['temperature'])
+    if 'max_tokens' in data:
+        model_params['max_tokens'] = int(data['max_tokens'])
+    if 'top_p' in data:
+        model_params['top_p'] = float(data['top_p'])
+    if 'top_k' in data:
+        model_params['top_k'] = int(data['top_k'])
+    return model_params
+
+# Most recent user/assistant pairs loaded as chat history (process_with_archetype uses fewer)
+HISTORY_WINDOW = 20
+
+def load_chat_history(db: Session, chat_id: str, user_id: int, archetype: str) -> list:
+    """Load the last HISTORY_WINDOW user/assistant pairs of a chat for process_with_archetype."""
+    chat_history = []
+    try:
+        rows = db.query(
+            ChatMessage.role,
+            ChatMessage.content,
+            ChatMessage.msg_metadata
+        ).filter(
+            and_(
+                ChatMessage.chat_id == chat_id,
+                ChatMessage.user_id == user_id
+            )
+        ).order_by(ChatMessage.message_index.desc()).limit(HISTORY_WINDOW * 2).all()
+        rows.reverse()
+        
+        # Don't start the window on the assistant half of a pair
+        if rows and rows[0].role == "assistant":
+            rows = rows[1:]
+        
+        # Convert to chat_history format (pairs of user/assistant)
+        for user_msg, assistant_msg in zip(rows[::2], rows[1::2]):
+            chat_history.append({
+                "user_input": user_msg.content,
+                "archetype": user_msg.msg_metadata.get("archetype", archetype) if user_msg.msg_metadata else archetype,
+                "model_response": assistant_msg.content
+            })
+        
+        logger.debug("Loaded %d message pairs from PostgreSQL", len(chat_history))
+    except Exception as e:
+        logger.warning(f"Error loading chat history from DB: {e}, using empty history")
+        chat_history = []
+    return chat_history
+
+def raise_process_error(error_msg: str):
+    """Log a process_with_archetype error and raise it as an HTTP 500."""
+    logger.error(f"Error processing request: {error_msg}")
+    
+    # Check if it's an API key error
+    if "API_KEY" in error_msg or "not found in configuration" in error_msg:
+        detail_msg = f"{error_msg}\n\nPlease configure AI provider in .env file:\n- GOOGLE_API_KEY for Google AI\n- OPENAI_API_KEY for OpenAI"
+    else:
+        detail_msg = error_msg
+    
+    raise HTTPException(status_code=500, detail=detail_msg)
+
+# Seconds a serialized GET /api/vector-db body is reused; writes to a user's chats drop it early
+VECTOR_DB_LIST_TTL = float(os.getenv("VECTOR_DB_LIST_TTL", "2.0"))
+
+# Only the unpaginated list is cached, at most VECTOR_DB_LIST_CACHE_MAX users,
+# oldest first: {user_id: (stored_at, body, etag)}
+VECTOR_DB_LIST_CACHE_MAX = 256
+_vector_db_list_cache: "OrderedDict[int, tuple]" = OrderedDict()
+
+def invalidate_vector_db_list(user_id: int):
+    """Forget the cached chat list of a user after their chats changed."""
+    _vector_db_list_cache.pop(user_id, None)
+
+def store_vector_db_list(user_id: int, body: bytes, etag: str):
+    """Cache a user's serialized chat list, dropping expired and over-limit entries."""
+    now = time.monotonic()
+    _vector_db_list_cache.pop(user_id, None)
+    _vector_db_list_cache[user_id] = (now, body, etag)
+    while _vector_db_list_cache:
+        stored_at = next(iter(_vector_db_list_cache.values()))[0]
+        if now - stored_at < VECTOR_DB_LIST_TTL and len(_vector_db_list_cache) <= VECTOR_DB_LIST_CACHE_MAX:
+            break
+        _vector_db_list_cache.popitem(last=False)
+
+def _insert_chat_turn(db: Session, chat_id: str, user_id: int, archetype: str, text: str, response_text: str) -> int:
+    """Insert a user/assistant message pair and commit (blocking); returns the assistant message id."""
+    try:
+        # One multi-row INSERT ... RETURNING; message_index is computed inside it (MAX + 1),
+        # and both rows see the same pre-insert MAX, hence the +1 for the assistant row
+        next_index = next_index_expr(chat_id, user_id)
+        rows = db.execute(
+            insert(ChatMessage).values([
+                {
+                    "chat_id": chat_id,
+                    "user_id": user_id,
+                    "role": "user",
+                    "content": text,
+                    "message_index": next_index,
+                    "msg_metadata": {"archetype": archetype}
+                },
+                {
+                    "chat_id": chat_id,
+                    "user_id": user_id,
+                    "role": "assistant",
+                    "content": response_text,
+                    "message_index": next_index + 1,
+                    "msg_metadata": {"archetype": archetype}
+                }
+            ]).returning(ChatMessage.id, ChatMessage.role)
+        ).all()
+        db.commit()
+        return next(row.id for row in rows if row.role == "assistant")
+    except Exception:
+        db.rollback()
+        raise
 
-def get_chat_file(chat_id):
-    return os.path.join(HISTORY_DIR, f"{chat_id}.json")
+async def save_chat_turn(db: Session, chat_id: str, user_id: int, archetype: str, text: str, response_text: str):
+    """Append a user/assistant message pair to a chat; failures are logged, not raised."""
+    # Serialize insert per chat so concurrent turns cannot claim the same message_index
+    async with chat_write_lock(user_id, chat_id):
+        try:
+            # Blocking DB I/O runs in a worker thread, off the event loop
+            assistant_id = await asyncio.to_thread(
+                _insert_chat_turn, db, chat_id, user_id, archetype, text, response_text
+            )
+            invalidate_vector_db_list(user_id)
+            logger.info("💾 Saved to PostgreSQL: chat_id=%s, +2 messages", chat_id)
+            increment_counter("db_saves")
+
+            # Index assistant message embedding (pgvector) in a debounced batch
+            await schedule_index(user_id, chat_id, assistant_id)
+        
+        except Exception as e:
+            logger.error(f"Failed to save to PostgreSQL: {e}", exc_info=True)
+            increment_counter("db_errors")
+            # Don't fail the request if save fails
 
 @app.post("/process")
 async def process_text(
@@ -186,7 +515,7 @@ async def process_text(
     with TimerContext("process_request"):
         try:
             increment_counter("api_requests")
-            data = await request.json()
+            data = orjson.loads(await request.body())
             text = data.get("text")
             archetype = data.get("archetype")
             remember = data.get("remember", True)
@@ -196,7 +525,7 @@ async def process_text(
             if user_id is None:
                 user_id = 1  # Admin user
             
-            logger.info(f"Processing request: user_id={user_id}, archetype={archetype}, chat_id={chat_id}, remember={remember}")
+            logger.info("Processing request: user_id=%s, archetype=%s, chat_id=%s, remember=%s", user_id, archetype, chat_id, remember)
             increment_counter(f"archetype_{archetype}")
             
             if not text or not archetype:
@@ -205,51 +534,19 @@ async def process_text(
                 increment_counter("api_errors")
                 raise HTTPException(status_code=400, detail=error_msg)
             
-            # Get model parameters from request (if provided)
-            model_params = {}
-            if 'temperature' in data:
-                model_params['temperature'] = float(data['temperature'])
-            if 'max_tokens' in data:
-                model_params['max_tokens'] = int(data['max_tokens'])
-            if 'top_p' in data:
-                model_params['top_p'] = float(data['top_p'])
-            if 'top_k' in data:
-                model_params['top_k'] = int(data['top_k'])
+            model_params = parse_model_params(data)
             
             # --- Load chat history from PostgreSQL ---
             chat_history = []
             if remember and chat_id:
-                try:
-                    from core.db_models import ChatMessage
-                    from sqlalchemy import and_
-                    
-                    messages = db.query(ChatMessage).filter(
-                        and_(
-                            ChatMessage.chat_id == chat_id,
-                            ChatMessage.user_id == user_id
-                        )
-                    ).order_by(ChatMessage.message_index).all()
-                    
-                    # Convert to chat_history format (pairs of user/assistant)
-                    for i in range(0, len(messages), 2):
-                        if i + 1 < len(messages):
-                            user_msg = messages[i]
-                            assistant_msg = messages[i + 1]
-                            chat_history.append({
-                                "user_input": user_msg.content,
-                                "archetype": user_msg.msg_metadata.get("archetype", archetype) if user_msg.msg_metadata else archetype,
-                                "model_response": assistant_msg.content
-                            })
-                    
-                    logger.debug(f"Loaded {len(chat_history)} message pairs from PostgreSQL")
-                except Exception as e:
-                    logger.warning(f"Error loading chat history from DB: {e}, using empty history")
-                    chat_history = []
+                chat_history = await asyncio.to_thread(load_chat_history, db, chat_id, user_id, archetype)
             
-            result = process_with_archetype(
+            # Model call blocks on network I/O, so run it in the default thread pool
+            result = await asyncio.to_thread(
+                process_with_archetype,
                 text=text,
                 archetype_name=archetype,
-                archetypes=archetypes,
+                archetypes=archetypes_snapshot()[1],
                 chat_history=chat_history,
                 chat_id=chat_id if remember else None,
                 user_id=user_id,
@@ -257,77 +554,18 @@ async def process_text(
             )
             
             if "error" in result:
-                error_msg = result["error"]
-                logger.error(f"Error processing request: {error_msg}")
                 increment_counter("api_errors")
-                
-                # Check if it's an API key error
-                if "API_KEY" in error_msg or "not found in configuration" in error_msg:
-                    detail_msg = f"{error_msg}\n\nPlease configure AI provider in .env file:\n- GOOGLE_API_KEY for Google AI\n- OPENAI_API_KEY for OpenAI"
-                else:
-                    detail_msg = error_msg
-                
-                raise HTTPException(status_code=500, detail=detail_msg)
+                raise_process_error(result["error"])
             
             # --- Save to PostgreSQL database ---
             if remember and chat_id:
-                try:
-                    from core.db_models import ChatMessage
-                    
-                    # Get current message count for this chat
-                    existing_count = db.query(ChatMessage).filter(
-                        and_(
-                            ChatMessage.chat_id == chat_id,
-                            ChatMessage.user_id == user_id
-                        )
-                    ).count()
-                    
-                    # Save user message
-                    user_msg = ChatMessage(
-                        chat_id=chat_id,
-                        user_id=user_id,
-                        role="user",
-                        content=text,
-                        message_index=existing_count,
-                        msg_metadata={"archetype": archetype}
-                    )
-                    db.add(user_msg)
-                    
-                    # Save assistant response
-                    assistant_msg = ChatMessage(
-                        chat_id=chat_id,
-                        user_id=user_id,
-                        role="assistant",
-                        content=result.get("response", ""),
-                        message_index=existing_count + 1,
-                        msg_metadata={"archetype": archetype}
-                    )
-                    db.add(assistant_msg)
-                    
-                    db.commit()
-                    logger.info(f"💾 Saved to PostgreSQL: chat_id={chat_id}, messages={existing_count} -> {existing_count + 2}")
-                    increment_counter("db_saves")
-
-                    # Index assistant message embedding (pgvector), ignore failures
-                    try:
-                        index_message(db, assistant_msg)
-                    except Exception as _e:
-                        logger.debug(f"Indexing assistant message failed: {_e}")
-                    
-                except Exception as e:
-                    db.rollback()
-                    logger.error(f"Failed to save to PostgreSQL: {e}", exc_info=True)
-                    increment_counter("db_errors")
-                    # Don't fail the request if save fails
+                await save_chat_turn(db, chat_id, user_id, archetype, text, result.get("response", ""))
             
             # Track cache hits/misses
-            if result.get("cached"):
-                increment_counter("cache_hits")
-            else:
-                increment_counter("cache_misses")
+            increment_counter("cache_hits" if result.get("cached") else "cache_misses")
             
             # Return result with cache status
-            return JSONResponse(content=result)
+            return Response(content=orjson.dumps(result), media_type="application/json")
         except HTTPException:
             raise
         except Exception as e:
@@ -335,6 +573,102 @@ async def process_text(
             increment_counter("api_errors")
             raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
+@app.post("/process/stream")
+async def process_text_stream(
+    request: Request,
+    db: Session = Depends(get_db),
+    user_id: Optional[int] = Depends(get_current_user_id_optional)
+):
+    """
+    Process text with selected archetype, streaming the answer as NDJSON.
+    Emits {"chunk": ...} lines while the model generates, then a final
+    {"done": true, "cached": ...} line once the turn has been saved.
+    """
+    with TimerContext("process_request"):
+        try:
+            increment_counter("api_requests")
+            data = orjson.loads(await request.body())
+            text = data.get("text")
+            archetype = data.get("archetype")
+            remember = data.get("remember", True)
+            chat_id = data.get("chat_id")
+            
+            # Default to admin user if no authentication
+            if user_id is None:
+                user_id = 1  # Admin user
+            
+            logger.info("Streaming request: user_id=%s, archetype=%s, chat_id=%s, remember=%s", user_id, archetype, chat_id, remember)
+            increment_counter(f"archetype_{archetype}")
+            
+            if not text or not archetype:
+                error_msg = "Text and archetype are required"
+                logger.warning(error_msg)
+                increment_counter("api_errors")
+                raise HTTPException(status_code=400, detail=error_msg)
+            
+            model_params = parse_model_params(data)
+            chat_history = []
+            if remember and chat_id:
+                chat_history = await asyncio.to_thread(load_chat_history, db, chat_id, user_id, archetype)
+            
+            result = await asyncio.to_thread(
+                process_with_archetype,
+                text=text,
+                archetype_name=archetype,
+                archetypes=archetypes_snapshot()[1],
+                chat_history=chat_history,
+                chat_id=chat_id if remember else None,
+                user_id=user_id,
+                stream=True,
+                **model_params
+            )
+            if "error" in result:
+                increment_counter("api_errors")
+                raise_process_error(result["error"])
+            increment_counter("cache_hits" if result.get("cached") else "cache_misses")
+        except HTTPException:
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error in process_text_stream: {e}", exc_info=True)
+            increment_counter("api_errors")
+            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+    
+    async def ndjson_stream():
+        # The body outlives the handler, so it is timed separately
+        with TimerContext("process_stream_body"):
+            try:
+                if "stream" not in result:
+                    # Cache hit: the full answer is already available
+                    parts = [result["response"]]
+                    yield orjson.dumps({"chunk": result["response"]}) + b"\n"
+                else:
+                    parts = []
+                    chunks = result["stream"]
+                    done = object()
+                    while True:
+                        # Each provider read blocks on the network
+                        chunk = await asyncio.to_thread(next, chunks, done)
+                        if chunk is done:
+                            break
+                        parts.append(chunk)
+                        yield orjson.dumps({"chunk": chunk}) + b"\n"
+                
+                if remember and chat_id:
+                    # The request-scoped session is closed before the body streams
+                    session_gen = get_db()
+                    try:
+                        await save_chat_turn(next(session_gen), chat_id, user_id, archetype, text, "".join(parts))
+                    finally:
+                        session_gen.close()
+                yield orjson.dumps({"done": True, "cached": bool(result.get("cached"))}) + b"\n"
+            except Exception as e:
+                # Headers are already sent: report the failure as the last NDJSON line
+                logger.error(f"Error streaming response: {e}", exc_info=True)
+                increment_counter("api_errors")
+                yield orjson.dumps({"error": str(e)}) + b"\n"
+    
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson")
+
 @app.get("/history", response_model=List[str])
 async def get_history_list(
     db: Session = Depends(get_db),
@@ -342,28 +676,24 @@ async def get_history_list(
 ):
     """Get list of chat IDs from PostgreSQL database."""
     try:
-        from core.db_models import ChatMessage
-        from sqlalchemy import distinct, func
         
         # Default to admin if no auth
         if user_id is None:
             user_id = 1
         
-        # Get distinct chat_ids for this user
-        chats = db.query(
-            ChatMessage.chat_id,
-            func.max(ChatMessage.created_at).label('last_message')
-        ).filter(
+        # Get distinct chat_ids for this user, newest first (query runs in a worker thread)
+        stmt = select(ChatMessage.chat_id).where(
             ChatMessage.user_id == user_id
         ).group_by(
             ChatMessage.chat_id
         ).order_by(
             func.max(ChatMessage.created_at).desc()
-        ).all()
+        )
+        chats = await asyncio.to_thread(lambda: db.execute(stmt).scalars().all())
         
         # Return chat IDs in same format as file-based system
-        chat_ids = [f"{chat.chat_id}.json" for chat in chats]
-        return chat_ids
+        chat_ids = [f"{chat_id}.json" for chat_id in chats]
+        return Response(content=orjson.dumps(chat_ids), media_type="application/json")
     except Exception as e:
         logger.error(f"Error getting history list: {e}", exc_info=True)
         return []
@@ -371,33 +701,32 @@ async def get_history_list(
 @app.get("/history/{filename}")
 async def get_history_file(
     filename: str,
+    request: Request,
     db: Session = Depends(get_db),
     user_id: Optional[int] = Depends(get_current_user_id_optional)
 ):
     """Get chat history from PostgreSQL database."""
-    if "/" in filename or "\\" in filename or ".." in filename:
-        return JSONResponse(status_code=400, content={"error": "Invalid filename"})
+    if _BAD_FILENAME_RE.search(filename):
+        return ORJSONResponse(status_code=400, content={"error": "Invalid filename"})
     try:
-        from core.db_models import ChatMessage
-        from sqlalchemy import and_
         
         # Extract chat_id from filename (remove .json extension)
-        chat_id = filename.replace(".json", "")
+        chat_id = filename.removesuffix(".json")
         
         # Default to admin if no auth
         if user_id is None:
             user_id = 1
         
-        # Get messages from database
-        messages = db.query(ChatMessage).filter(
+        # Get messages from database (query runs in a worker thread)
+        messages = await asyncio.to_thread(db.query(ChatMessage).filter(
             and_(
                 ChatMessage.chat_id == chat_id,
                 ChatMessage.user_id == user_id
             )
-        ).order_by(ChatMessage.message_index).all()
+        ).order_by(ChatMessage.message_index).all)
         
         if not messages:
-            return JSONResponse(status_code=404, content={"error": "Chat not found"})
+            return ORJSONResponse(status_code=404, content={"error": "Chat not found"})
         
         # Convert to file format (array of pairs)
         data = []
@@ -411,10 +740,50 @@ async def get_history_file(
                     "model_response": assistant_msg.content
                 })
         
-        return JSONResponse(content=data)
+        return with_etag(request, Response(content=orjson.dumps(data), media_type="application/json"))
     except Exception as e:
         logger.error(f"Error getting chat: {e}", exc_info=True)
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
+
+def delete_chat_rows(db: Session, chat_id: str, user_id: int) -> int:
+    """Delete a chat's embeddings and messages and commit (blocking); returns the number of messages deleted."""
+    try:
+        # Delete related embeddings first
+        logger.info(f"Attempting to delete embeddings for chat ID: {chat_id} and user: {user_id}")
+        # Bulk DELETE statements; nothing in the session needs syncing
+        db.execute(
+            delete(ChatEmbedding).where(
+                and_(
+                    ChatEmbedding.chat_id == chat_id,
+                    ChatEmbedding.user_id == user_id
+                )
+            ).execution_options(synchronize_session=False)
+        )
+
+        # Delete all messages for this chat
+        logger.info(f"Attempting to delete chat with ID: {chat_id} for user: {user_id}")
+        deleted = db.execute(
+            delete(ChatMessage).where(
+                and_(
+                    ChatMessage.chat_id == chat_id,
+                    ChatMessage.user_id == user_id
+                )
+            ).execution_options(synchronize_session=False)
+        ).rowcount
+
+        db.commit()
+        return deleted
+    except Exception:
+        db.rollback()
+        raise
+
+def delete_chat_from_vector_db(chat_id: str):
+    """Remove a deleted chat from the vector database (runs after the response is sent)."""
+    try:
+        delete_chat(chat_id)
+        logger.info(f"Chat {chat_id} successfully deleted from vector database.")
+    except Exception as e:
+        logger.warning(f"Failed to delete chat {chat_id} from vector database: {e}")
 
 @app.delete("/history/{filename}")
 async def delete_history_file(
@@ -423,155 +792,104 @@ async def delete_history_file(
     user_id: Optional[int] = Depends(get_current_user_id_optional)
 ):
     """Delete chat from PostgreSQL database and vector database."""
-    if "/" in filename or "\\" in filename or ".." in filename:
-        return JSONResponse(status_code=400, content={"error": "Invalid filename"})
+    if _BAD_FILENAME_RE.search(filename):
+        return ORJSONResponse(status_code=400, content={"error": "Invalid filename"})
     try:
-        from core.db_models import ChatMessage, ChatEmbedding
-        from sqlalchemy import and_
-        from vector_db.client import delete_chat, is_vector_db_available
 
         # Extract chat_id from filename
-        chat_id = filename.replace(".json", "")
+        chat_id = filename.removesuffix(".json")
 
         # Default to admin if no auth
         if user_id is None:
             user_id = 1
 
-        # Delete related embeddings first
-        logger.info(f"Attempting to delete embeddings for chat ID: {chat_id} and user: {user_id}")
-        db.query(ChatEmbedding).filter(
-            and_(
-                ChatEmbedding.chat_id == chat_id,
-                ChatEmbedding.user_id == user_id
-            )
-        ).delete()
-
-        # Delete all messages for this chat
-        logger.info(f"Attempting to delete chat with ID: {chat_id} for user: {user_id}")
-        deleted = db.query(ChatMessage).filter(
-            and_(
-                ChatMessage.chat_id == chat_id,
-                ChatMessage.user_id == user_id
-            )
-        ).delete()
-
-        db.commit()
+        deleted = await asyncio.to_thread(delete_chat_rows, db, chat_id, user_id)
+        invalidate_vector_db_list(user_id)
 
         if deleted == 0:
-            return JSONResponse(status_code=404, content={"error": "Chat not found"})
+            return ORJSONResponse(status_code=404, content={"error": "Chat not found"})
 
         logger.info(f"Deleted {deleted} messages from chat {chat_id}")
 
-        # Delete from vector database
-        if is_vector_db_available():
-            try:
-                delete_chat(chat_id)
-                logger.info(f"Chat {chat_id} successfully deleted from vector database.")
-            except Exception as e:
-                logger.warning(f"Failed to delete chat {chat_id} from vector database: {e}")
+        # Delete from vector database once the response is out
+        background = BackgroundTask(delete_chat_from_vector_db, chat_id) if is_vector_db_available() else None
 
-        return JSONResponse(content={"status": "deleted", "messages_deleted": deleted})
+        return ORJSONResponse(content={"status": "deleted", "messages_deleted": deleted}, background=background)
     except Exception as e:
         logger.error(f"Error deleting history file {filename}: {e}", exc_info=True)
-        return JSONResponse(status_code=500, content={"error": str(e)})
-
+        return ORJSONResponse(status_code=500, content={"error": str(e)})
+
+
+def _chat_search_condition(db: Session, query: str):
+    """Message text filter: Postgres full-text search (GIN-indexed), substring match elsewhere."""
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_tsvector('simple', ChatMessage.content).op('@@')(func.plainto_tsquery('simple', query))
+    return ChatMessage.content.icontains(query, autoescape=True)
+
+def search_chats_in_db(db: Session, user_id: int, query: Optional[str], archetype: Optional[str]) -> list:
+    """Chats of a user whose messages match the text query and/or archetype, newest first (blocking)."""
+    matching = db.query(
+        ChatMessage.chat_id,
+        func.max(ChatMessage.created_at).label('last_message')
+    ).filter(ChatMessage.user_id == user_id)
+    if query:
+        matching = matching.filter(ChatMessage.chat_id.in_(
+            select(ChatMessage.chat_id).where(
+                ChatMessage.user_id == user_id,
+                _chat_search_condition(db, query)
+            )
+        ))
+    if archetype:
+        matching = matching.filter(ChatMessage.chat_id.in_(
+            select(ChatMessage.chat_id).where(
+                ChatMessage.user_id == user_id,
+                func.lower(ChatMessage.msg_metadata["archetype"].as_string()) == archetype.lower()
+            )
+        ))
+    chats = matching.group_by(ChatMessage.chat_id).order_by(func.max(ChatMessage.created_at).desc()).all()
+    first_messages = _first_user_messages(db, user_id, [chat.chat_id for chat in chats])
+    
+    results = []
+    for chat in chats:
+        first_msg = first_messages.get(chat.chat_id)
+        results.append({
+            "filename": f"{chat.chat_id}.json",
+            "preview": first_msg.preview if first_msg else "",
+            "archetype": first_msg.msg_metadata.get("archetype", "") if first_msg and first_msg.msg_metadata else "",
+            "timestamp": chat.last_message.isoformat() if chat.last_message else "",
+            "matches": {
+                "query": bool(query),
+                "archetype": bool(archetype)
+            }
+        })
+    return results
 
 @app.get("/api/history/search")
-async def search_history(query: str = None, archetype: str = None):
-    """Search history files by text content and/or archetype."""
+async def search_history(
+    query: str = None,
+    archetype: str = None,
+    db: Session = Depends(get_db),
+    user_id: Optional[int] = Depends(get_current_user_id_optional)
+):
+    """Search chats in PostgreSQL by text content and/or archetype."""
     try:
         # Allow search with just query or just archetype, or both
         # If both are None, return empty results
         if not query and not archetype:
-            return JSONResponse(content={
-                "results": [],
-                "count": 0,
-                "query": query,
-                "archetype": archetype
-            })
-        
-        if not os.path.exists(HISTORY_DIR):
-            os.makedirs(HISTORY_DIR, exist_ok=True)
-            return JSONResponse(content={
+            return ORJSONResponse(content={
                 "results": [],
                 "count": 0,
                 "query": query,
                 "archetype": archetype
             })
         
-        files = [f for f in os.listdir(HISTORY_DIR) if f.endswith('.json')]
-        results = []
-        
-        query_lower = query.lower() if query else None
-        archetype_lower = archetype.lower() if archetype else None
-        
-        for filename in files:
-            try:
-                filepath = os.path.join(HISTORY_DIR, filename)
-                async with aiofiles.open(filepath, "r", encoding="utf-8") as f:
-                    content = await f.read()
-                    data = json.loads(content)
-                
-                # Check if matches archetype filter
-                matches_archetype = True
-                if archetype_lower:
-                    # Check if any message has matching archetype
-                    if isinstance(data, list):
-                        # Regular chat format
-                        matches_archetype = any(
-                            msg.get('archetype', '').lower() == archetype_lower 
-                            for msg in data if isinstance(msg, dict)
-                        )
-                    elif isinstance(data, dict):
-                        # RADA format or other format
-                        matches_archetype = (
-                            data.get('archetype', '').lower() == archetype_lower or
-                            archetype_lower in str(data.get('archetypes', '')).lower()
-                        )
-                # If no archetype filter, matches_archetype remains True
-                
-                # Check if matches text query
-                matches_query = True
-                if query_lower:
-                    # Search in all messages
-                    content_lower = content.lower()
-                    matches_query = query_lower in content_lower
-                # If no query, matches_query remains True
-                
-                # Include result if it matches both filters (or if filter is not applied)
-                if matches_archetype and matches_query:
-                    # Extract preview and metadata
-                    preview = ""
-                    chat_archetype = ""
-                    timestamp = filename.split('_')[0] if '_' in filename else ""
-                    
-                    if isinstance(data, list) and len(data) > 0:
-                        first_msg = data[0]
-                        if isinstance(first_msg, dict):
-                            preview = first_msg.get('user_input', '')[:100]
-                            chat_archetype = first_msg.get('archetype', '')
-                    elif isinstance(data, dict):
-                        preview = data.get('user_input', '')[:100]
-                        chat_archetype = data.get('archetype', '') or str(data.get('archetypes', ''))
-                    
-                    results.append({
-                        "filename": filename,
-                        "preview": preview,
-                        "archetype": chat_archetype,
-                        "timestamp": timestamp,
-                        "matches": {
-                            "query": matches_query if query else False,
-                            "archetype": matches_archetype if archetype else False
-                        }
-                    })
-            except Exception as e:
-                logger.warning(f"Error reading history file {filename}: {e}")
-                continue
+        # Default to admin if no auth
+        if user_id is None:
+            user_id = 1
         
-        # Sort by timestamp (newest first)
-        results.sort(key=lambda x: x['timestamp'], reverse=True)
+        results = await asyncio.to_thread(search_chats_in_db, db, user_id, query, archetype)
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "results": results,
             "count": len(results),
             "query": query,
@@ -583,49 +901,111 @@ async def search_history(query: str = None, archetype: str = None):
         logger.error(f"Error searching history: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error searching history: {str(e)}")
 
+# The favicon ships with the app, so it is stat'ed once at startup
+try:
+    _FAVICON_STAT = os.stat(FAVICON_PATH)
+    _FAVICON_HEADERS = {
+        "Cache-Control": "public, max-age=86400, immutable",
+        "ETag": f'"{_FAVICON_STAT.st_mtime_ns:x}-{_FAVICON_STAT.st_size:x}"'
+    }
+except OSError:
+    _FAVICON_STAT = None
+    _FAVICON_HEADERS = {}
+
 @app.get("/favicon.ico")
-async def favicon():
-    favicon_path = resource_path("static/favicon.ico")
-    if os.path.exists(favicon_path):
-        return FileResponse(favicon_path)
-    else:
+async def favicon(request: Request):
+    if _FAVICON_STAT is None:
         raise HTTPException(status_code=404, detail="Favicon not found")
+    if request.headers.get("if-none-match") == _FAVICON_HEADERS["ETag"]:
+        return Response(status_code=304, headers=_FAVICON_HEADERS)
+    return FileResponse(FAVICON_PATH, headers=_FAVICON_HEADERS, stat_result=_FAVICON_STAT)
 
 def get_archetypes_yaml_path():
     """Get path to archetypes.yaml with PyInstaller support."""
-    base_dir = get_base_directory()
-    return os.path.join(base_dir, "archetypes.yaml")
+    return ARCHETYPES_YAML_PATH
 
 def get_prompts_directory():
     """Get path to prompts directory with PyInstaller support."""
-    base_dir = get_base_directory()
-    prompts_dir = os.path.join(base_dir, "prompts")
-    # Create directory if it doesn't exist
-    os.makedirs(prompts_dir, exist_ok=True)
-    return prompts_dir
+    return PROMPTS_DIR
+
+# Parsed archetypes.yaml keyed by its mtime; callers must treat the dict as read-only
+_archetypes_yaml_cache = {"mtime": None, "data": None}
+
+def read_archetypes_yaml(path: str):
+    """Parse archetypes.yaml, reusing the previous result while the file is unchanged.
+
+    Raises FileNotFoundError if the file does not exist.
+    """
+    mtime = os.stat(path).st_mtime_ns
+    if _archetypes_yaml_cache["mtime"] == mtime:
+        return _archetypes_yaml_cache["data"]
+    with open(path, "r", encoding="utf-8") as f:
+        data = yaml.load(f, Loader=YamlLoader)
+    _archetypes_yaml_cache["mtime"] = mtime
+    _archetypes_yaml_cache["data"] = data
+    return data
+
+# Serialized GET /api/archetypes body, keyed by archetypes.yaml and prompt file mtimes
+_archetypes_payload_cache = {"sig": None, "body": None, "etag": None}
+
+def is_prompt_file_ref(value) -> bool:
+    return isinstance(value, str) and value.endswith(('.txt', '.md'))
+
+def prompt_file_refs(config: dict) -> list:
+    """Collect the distinct prompt file paths referenced by an archetypes config."""
+    refs = {}
+    for archetype_config in config.values():
+        if not isinstance(archetype_config, dict):
+            continue
+        if archetype_config.get("prompt_file"):
+            refs[archetype_config["prompt_file"]] = None
+        additional_prompts = archetype_config.get("additional_prompts") or []
+        if isinstance(additional_prompts, str):
+            additional_prompts = [additional_prompts]
+        refs.update((p, None) for p in additional_prompts if is_prompt_file_ref(p))
+    return list(refs)
+
+def archetypes_payload_signature(archetypes_path: str, refs: list) -> tuple:
+    """Return a tuple that changes whenever the YAML or any referenced prompt file changes."""
+    prompt_mtimes = []
+    for ref in refs:
+        path = resolve_prompt_path(ref)
+        prompt_mtimes.append((ref, os.stat(path).st_mtime_ns if path else None))
+    return (os.stat(archetypes_path).st_mtime_ns, tuple(prompt_mtimes))
 
 @app.get("/api/archetypes")
-async def get_archetypes_config():
+async def get_archetypes_config(request: Request):
     """Get current agent configuration with prompt file contents for editing."""
     try:
-        from core.logic import load_prompt_file
         
         logger.debug("Loading archetypes configuration")
-        archetypes_path = get_archetypes_yaml_path()
+        archetypes_path = ARCHETYPES_YAML_PATH
         
-        if not os.path.exists(archetypes_path):
+        try:
+            config = read_archetypes_yaml(archetypes_path)
+        except FileNotFoundError:
             error_msg = f"archetypes.yaml not found at {archetypes_path}"
             logger.error(error_msg)
             raise HTTPException(status_code=404, detail=error_msg)
         
-        with open(archetypes_path, "r", encoding="utf-8") as f:
-            config = yaml.safe_load(f)
-        
         if config is None:
             error_msg = "archetypes.yaml is empty or invalid"
             logger.error(error_msg)
             raise HTTPException(status_code=500, detail=error_msg)
         
+        refs = prompt_file_refs(config)
+        sig = archetypes_payload_signature(archetypes_path, refs)
+        if _archetypes_payload_cache["sig"] == sig:
+            return with_etag(
+                request,
+                Response(content=_archetypes_payload_cache["body"], media_type="application/json"),
+                _archetypes_payload_cache["etag"],
+            )
+        
+        # Read every distinct prompt file once, concurrently, in the thread pool
+        loaded = await asyncio.gather(*(asyncio.to_thread(load_prompt_file, ref) for ref in refs))
+        prompt_contents = dict(zip(refs, loaded))
+        
         # Load prompt file contents for editing
         config_with_contents = {}
         for key, archetype_config in config.items():
@@ -640,7 +1020,7 @@ async def get_archetypes_config():
             # We add it as a separate field for the UI, but keep prompt_file as the source of truth
             if "prompt_file" in config_copy:
                 prompt_file_path = config_copy["prompt_file"]
-                prompt_content = load_prompt_file(prompt_file_path)
+                prompt_content = prompt_contents.get(prompt_file_path)
                 if prompt_content:
                     # Add prompt content for editing (temporary field, not saved to YAML)
                     config_copy["_prompt_content"] = prompt_content  # Temporary field, not saved to YAML
@@ -659,11 +1039,11 @@ async def get_archetypes_config():
                     if not add_prompt:
                         continue
                     # Check if it's a file path
-                    if isinstance(add_prompt, str) and any(add_prompt.endswith(ext) for ext in ['.txt', '.md']):
+                    if is_prompt_file_ref(add_prompt):
                         # Keep the file path
                         loaded_additional.append(add_prompt)
                         # Load content for editing
-                        content = load_prompt_file(add_prompt)
+                        content = prompt_contents.get(add_prompt)
                         additional_contents.append(content if content else "")
                     else:
                         # It's already text (shouldn't happen in clean config, but handle it)
@@ -679,7 +1059,11 @@ async def get_archetypes_config():
             config_with_contents[key] = config_copy
         
         logger.info(f"Archetypes configuration loaded: {len(config_with_contents)} archetypes")
-        return JSONResponse(content={"archetypes": config_with_contents})
+        body = orjson.dumps({"archetypes": config_with_contents})
+        _archetypes_payload_cache["sig"] = sig
+        _archetypes_payload_cache["body"] = body
+        _archetypes_payload_cache["etag"] = body_etag(body)
+        return with_etag(request, Response(content=body, media_type="application/json"), _archetypes_payload_cache["etag"])
     except HTTPException:
         raise
     except yaml.YAMLError as e:
@@ -691,15 +1075,45 @@ async def get_archetypes_config():
         logger.error(error_msg, exc_info=True)
         raise HTTPException(status_code=500, detail=error_msg)
 
+REQUIRED_ARCHETYPE_FIELDS = frozenset({"name", "model_name"})
+
+# Comment header written at the top of archetypes.yaml on every save
+ARCHETYPES_YAML_HEADER = (
+    "# Configuration of archetypes (agents)\n"
+    "# Adding and editing agents is done through this file\n"
+    "# Use:\n"
+    "# 1. prompt_file: path to file with main prompt (e.g., prompts/sofiya_base.txt)\n"
+    "# 2. additional_prompts: list of additional prompts (files .txt/.md)\n"
+    "#\n"
+    "# Maximum 3 agents for RADA mode\n"
+    "#\n"
+    "# NOTE: All prompts must be in separate files in the prompts/ directory.\n"
+    "# When creating agents through the web interface, text prompts are automatically\n"
+    "# converted to files in the prompts/ directory.\n\n"
+)
+
+def write_prompt_file(path: str, content: str) -> bool:
+    """Atomically write a prompt file unless it already holds this content.
+
+    Returns True if the file was written.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            if f.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    atomic_write_text(path, content)
+    return True
+
 @app.post("/api/archetypes")
 async def save_archetypes_config(request: Request):
     """Save agent configuration. Automatically creates prompt files for text prompts."""
     try:
-        from core.logic import load_prompt_file
         
-        data = await request.json()
+        data = orjson.loads(await request.body())
         archetypes_config = data.get("archetypes", {})
-        prompts_dir = get_prompts_directory()
+        prompts_dir = PROMPTS_DIR
         
         logger.info(f"Saving archetypes configuration: {len(archetypes_config)} archetypes")
         
@@ -711,13 +1125,15 @@ async def save_archetypes_config(request: Request):
             raise HTTPException(status_code=400, detail=error_msg)
         
         # Load original config to preserve file paths
-        archetypes_path = get_archetypes_yaml_path()
-        original_config = {}
-        if os.path.exists(archetypes_path):
-            with open(archetypes_path, "r", encoding="utf-8") as f:
-                original_config = yaml.safe_load(f) or {}
+        archetypes_path = ARCHETYPES_YAML_PATH
+        try:
+            original_config = read_archetypes_yaml(archetypes_path) or {}
+        except FileNotFoundError:
+            original_config = {}
         
         # Process each archetype: convert text prompts to files
+        # Prompt files are collected here and written together once the whole config is valid
+        prompt_writes = {}
         processed_config = {}
         for archetype_key, archetype_config in archetypes_config.items():
             if not isinstance(archetype_config, dict):
@@ -726,12 +1142,10 @@ async def save_archetypes_config(request: Request):
                 raise HTTPException(status_code=400, detail=error_msg)
             
             # Validate required fields
-            if "name" not in archetype_config:
-                error_msg = f"Agent '{archetype_key}' must have 'name' field"
-                logger.error(error_msg)
-                raise HTTPException(status_code=400, detail=error_msg)
-            if "model_name" not in archetype_config:
-                error_msg = f"Agent '{archetype_key}' must have 'model_name' field"
+            missing = REQUIRED_ARCHETYPE_FIELDS - archetype_config.keys()
+            if missing:
+                fields = ", ".join(f"'{field}'" for field in sorted(missing))
+                error_msg = f"Agent '{archetype_key}' must have {fields} field{'s' if len(missing) > 1 else ''}"
                 logger.error(error_msg)
                 raise HTTPException(status_code=400, detail=error_msg)
             
@@ -759,13 +1173,8 @@ async def save_archetypes_config(request: Request):
                 else:
                     file_name = prompt_file_path
                 
-                file_full_path = os.path.join(prompts_dir, file_name)
-                # Ensure directory exists
-                os.makedirs(os.path.dirname(file_full_path) if os.path.dirname(file_full_path) else prompts_dir, exist_ok=True)
-                
                 # Save prompt to file
-                with open(file_full_path, "w", encoding="utf-8") as pf:
-                    pf.write(prompt_text)
+                prompt_writes[os.path.join(prompts_dir, file_name)] = prompt_text
                 
                 # Always use prompt_file in YAML (never prompt)
                 new_config["prompt_file"] = prompt_file_path
@@ -824,13 +1233,8 @@ async def save_archetypes_config(request: Request):
                     else:
                         file_name = file_path
                     
-                    file_full_path = os.path.join(prompts_dir, file_name)
-                    # Ensure directory exists
-                    os.makedirs(os.path.dirname(file_full_path) if os.path.dirname(file_full_path) else prompts_dir, exist_ok=True)
-                    
                     # Save content to file
-                    with open(file_full_path, "w", encoding="utf-8") as apf:
-                        apf.write(str(add_prompt))
+                    prompt_writes[os.path.join(prompts_dir, file_name)] = str(add_prompt)
                     
                     # Use file path
                     processed_additional.append(file_path)
@@ -843,46 +1247,47 @@ async def save_archetypes_config(request: Request):
             
             processed_config[archetype_key] = new_config
         
-        # Get path to archetypes.yaml
-        archetypes_path = get_archetypes_yaml_path()
-        backup_path = archetypes_path + ".backup"
-        
-        # Create backup
-        try:
-            if os.path.exists(archetypes_path):
-                shutil.copy(archetypes_path, backup_path)
-        except Exception:
-            pass  # If backup creation failed, continue
-        
-        # Save new configuration
-        with open(archetypes_path, "w", encoding="utf-8") as f:
-            # Write header with comments
-            f.write("# Configuration of archetypes (agents)\n")
-            f.write("# Adding and editing agents is done through this file\n")
-            f.write("# Use:\n")
-            f.write("# 1. prompt_file: path to file with main prompt (e.g., prompts/sofiya_base.txt)\n")
-            f.write("# 2. additional_prompts: list of additional prompts (files .txt/.md)\n")
-            f.write("#\n")
-            f.write("# Maximum 3 agents for RADA mode\n")
-            f.write("#\n")
-            f.write("# NOTE: All prompts must be in separate files in the prompts/ directory.\n")
-            f.write("# When creating agents through the web interface, text prompts are automatically\n")
-            f.write("# converted to files in the prompts/ directory.\n\n")
+        # Ensure each target directory exists once, then write prompt files in parallel
+        for directory in {os.path.dirname(path) or prompts_dir for path in prompt_writes}:
+            os.makedirs(directory, exist_ok=True)
+        written = await asyncio.gather(*(
+            asyncio.to_thread(write_prompt_file, path, content)
+            for path, content in prompt_writes.items()
+        ))
+        logger.debug(f"Prompt files: {sum(written)} written, {len(written) - sum(written)} unchanged")
+        
+        # A repeated save of the same config leaves archetypes.yaml and every
+        # prompt file untouched; skip the rewrite and the full archetype reload
+        yaml_changed = processed_config != original_config
+        
+        if yaml_changed:
+            # Get path to archetypes.yaml
+            archetypes_path = ARCHETYPES_YAML_PATH
+            backup_path = archetypes_path + ".backup"
             
-            # Save configuration
-            yaml.dump(processed_config, f, allow_unicode=True, default_flow_style=False, sort_keys=False)
+            # Create backup
+            try:
+                if os.path.exists(archetypes_path):
+                    shutil.copy(archetypes_path, backup_path)
+            except Exception:
+                pass  # If backup creation failed, continue
+            
+            # Save new configuration: header and YAML go out in one atomic write
+            yaml_text = yaml.dump(processed_config, Dumper=YamlDumper, allow_unicode=True, default_flow_style=False, sort_keys=False)
+            await asyncio.to_thread(atomic_write_text, archetypes_path, ARCHETYPES_YAML_HEADER + yaml_text)
         
-        # Reload archetypes in memory
-        try:
-            reload_archetypes()
-            global archetypes
-            archetypes = load_archetypes()
-            logger.info("Archetypes reloaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to reload archetypes: {e}", exc_info=True)
-            # Continue anyway - configuration is saved
+        if yaml_changed or any(written):
+            # Reload archetypes in memory
+            try:
+                replace_archetypes(reload_archetypes())
+                logger.info("Archetypes reloaded successfully")
+            except Exception as e:
+                logger.error(f"Failed to reload archetypes: {e}", exc_info=True)
+                # Continue anyway - configuration is saved
+        else:
+            logger.info("Archetypes configuration unchanged, skipping write and reload")
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success", 
             "message": "Configuration saved successfully. All text prompts have been converted to files."
         })
@@ -895,7 +1300,7 @@ async def save_archetypes_config(request: Request):
 
 # --- API for AI provider configuration ---
 @app.get("/api/ai-provider")
-async def get_ai_provider_config():
+async def get_ai_provider_config(request: Request):
     """Get current AI provider configuration."""
     try:
         provider = get_current_provider()
@@ -910,15 +1315,40 @@ async def get_ai_provider_config():
             "has_openai_key": bool(config.get('openai_api_key')),
             "openai_base_url": config.get('openai_base_url', 'https://api.openai.com/v1'),
         }
-        return JSONResponse(content=safe_config)
+        return with_etag(request, Response(content=orjson.dumps(safe_config), media_type="application/json"))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting configuration: {str(e)}")
 
+# Parsed .env keyed by its mtime; callers must treat the dict as read-only
+_env_file_cache = {"key": None, "values": {}}
+
+def read_env_file(env_path: str) -> dict:
+    """Return parsed .env values, re-parsing only when the file's mtime changes."""
+    try:
+        key = (env_path, os.stat(env_path).st_mtime_ns)
+    except FileNotFoundError:
+        return {}
+    if _env_file_cache["key"] != key:
+        _env_file_cache["values"] = dotenv_values(env_path)
+        _env_file_cache["key"] = key
+    return _env_file_cache["values"]
+
+def rewrite_env_file(env_path: str, updates: dict):
+    """Merge updates into .env and write it back (blocking; run via asyncio.to_thread)."""
+    env_vars = dict(read_env_file(env_path))
+    env_vars.update(updates)
+    env_vars = {key: value for key, value in env_vars.items() if value}
+    # Replace the file atomically so a crash mid-write cannot leave a torn .env
+    atomic_write_text(env_path, "".join(f"{key}={value}\n" for key, value in env_vars.items()))
+    # We just wrote these values; prime the cache instead of re-parsing the file
+    _env_file_cache["values"] = env_vars
+    _env_file_cache["key"] = (env_path, os.stat(env_path).st_mtime_ns)
+
 @app.post("/api/ai-provider")
 async def save_ai_provider_config(request: Request):
     """Save AI provider configuration."""
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         provider_name = data.get("provider", "google_ai").lower()
         
         # Validate provider
@@ -947,40 +1377,24 @@ async def save_ai_provider_config(request: Request):
         set_provider(provider, config)
         
         # Update .env file
-        if hasattr(sys, '_MEIPASS'):
-            if getattr(sys, 'frozen', False):
-                base_dir = os.path.dirname(sys.executable)
-            else:
-                base_dir = os.path.dirname(os.path.abspath(__file__))
-        else:
-            base_dir = os.getcwd()
-        env_path = os.path.join(base_dir, '.env')
-        
-        # Read existing .env
-        env_vars = {}
-        if os.path.exists(env_path):
-            from dotenv import dotenv_values
-            env_vars = dotenv_values(env_path)
+        env_path = ENV_PATH
         
         # Update values
-        env_vars['AI_PROVIDER'] = provider_name
+        env_updates = {'AI_PROVIDER': provider_name}
         if google_api_key:
-            env_vars['GOOGLE_API_KEY'] = google_api_key
+            env_updates['GOOGLE_API_KEY'] = google_api_key
         if openai_api_key:
-            env_vars['OPENAI_API_KEY'] = openai_api_key
+            env_updates['OPENAI_API_KEY'] = openai_api_key
         if openai_base_url:
-            env_vars['OPENAI_BASE_URL'] = openai_base_url
+            env_updates['OPENAI_BASE_URL'] = openai_base_url
         
-        # Write .env
-        with open(env_path, 'w', encoding='utf-8') as f:
-            for key, value in env_vars.items():
-                if value:
-                    f.write(f"{key}={value}\n")
+        # Merge into .env off the event loop
+        await asyncio.to_thread(rewrite_env_file, env_path, env_updates)
         
         # Reload configuration
         load_provider_config()
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success",
             "message": f"Provider {provider_name} configured successfully"
         })
@@ -990,75 +1404,225 @@ async def save_ai_provider_config(request: Request):
         raise HTTPException(status_code=500, detail=f"Error saving configuration: {str(e)}")
 
 # --- API for vector database operations ---
+def _format_chat_entry(chat, first_msg) -> dict:
+    """Build a /api/vector-db list entry from a grouped chat row and its first user message."""
+    return {
+        "id": chat.chat_id,
+        "preview": first_msg.preview if first_msg else "No preview",
+        "message_count": chat.message_count,
+        "archetype": first_msg.msg_metadata.get("archetype", "unknown") if first_msg and first_msg.msg_metadata else "unknown",
+        "metadata": {
+            "first_message": chat.first_message.isoformat() if chat.first_message else None,
+            "last_message": chat.last_message.isoformat() if chat.last_message else None
+        }
+    }
+
+def _chat_summaries_query(db: Session, user_id: int):
+    """Chats of a user grouped by chat_id, most recently active first."""
+    return db.query(
+        ChatMessage.chat_id,
+        func.min(ChatMessage.created_at).label('first_message'),
+        func.max(ChatMessage.created_at).label('last_message'),
+        func.count(ChatMessage.id).label('message_count')
+    ).filter(
+        ChatMessage.user_id == user_id
+    ).group_by(
+        ChatMessage.chat_id
+    ).order_by(
+        func.max(ChatMessage.created_at).desc()
+    )
+
+# Characters of the first user message shown in the chat list
+CHAT_PREVIEW_LENGTH = 100
+
+def _first_user_messages(db: Session, user_id: int, chat_ids: Optional[List[str]] = None) -> dict:
+    """First user message of every chat (for preview) in one query instead of one per chat.
+
+    The preview is truncated in SQL so full message bodies are never loaded for the list.
+    """
+    first_user_index = db.query(
+        ChatMessage.chat_id,
+        func.min(ChatMessage.message_index).label('message_index')
+    ).filter(
+        ChatMessage.user_id == user_id,
+        ChatMessage.role == "user"
+    )
+    if chat_ids is not None:
+        first_user_index = first_user_index.filter(ChatMessage.chat_id.in_(chat_ids))
+    first_user_index = first_user_index.group_by(ChatMessage.chat_id).subquery()
+    return {
+        row.chat_id: row
+        for row in db.query(
+            ChatMessage.chat_id,
+            func.substr(ChatMessage.content, 1, CHAT_PREVIEW_LENGTH).label('preview'),
+            ChatMessage.msg_metadata
+        ).join(
+            first_user_index,
+            and_(
+                ChatMessage.chat_id == first_user_index.c.chat_id,
+                ChatMessage.message_index == first_user_index.c.message_index
+            )
+        ).filter(
+            ChatMessage.user_id == user_id,
+            ChatMessage.role == "user"
+        )
+    }
+
+VECTOR_DB_STREAM_BATCH = 500
+
+def _stream_chat_entries(user_id: int):
+    """Yield /api/vector-db entries as NDJSON lines, one batch of chats at a time.
+
+    Uses its own session: the request-scoped one is closed before the body streams.
+    """
+    session_gen = get_db()
+    try:
+        db = next(session_gen)
+        batch = []
+        for chat in _chat_summaries_query(db, user_id).yield_per(VECTOR_DB_STREAM_BATCH):
+            batch.append(chat)
+            if len(batch) == VECTOR_DB_STREAM_BATCH:
+                yield _chat_entries_ndjson(db, user_id, batch)
+                batch = []
+        if batch:
+            yield _chat_entries_ndjson(db, user_id, batch)
+    finally:
+        session_gen.close()
+
+def _chat_entries_ndjson(db: Session, user_id: int, chats: list) -> bytes:
+    first_messages = _first_user_messages(db, user_id, [chat.chat_id for chat in chats])
+    return b"".join(
+        orjson.dumps(_format_chat_entry(chat, first_messages.get(chat.chat_id))) + b"\n"
+        for chat in chats
+    )
+
+def build_vector_db_list(db: Session, user_id: int, limit: Optional[int], offset: int) -> bytes:
+    """Query and serialize a user's chat list, or one limit/offset page of it (blocking)."""
+    if limit is None:
+        # Get all chats grouped by chat_id
+        chats_query = _chat_summaries_query(db, user_id).all()
+        first_messages = _first_user_messages(db, user_id)
+        total = len(chats_query)
+    else:
+        # Window in the database and fetch previews for this page only
+        chats_query = _chat_summaries_query(db, user_id).offset(max(offset, 0)).limit(max(limit, 0)).all()
+        first_messages = _first_user_messages(db, user_id, [chat.chat_id for chat in chats_query])
+        total = db.query(func.count(distinct(ChatMessage.chat_id))).filter(
+            ChatMessage.user_id == user_id
+        ).scalar()
+    
+    # Format for UI
+    entries = [_format_chat_entry(chat, first_messages.get(chat.chat_id)) for chat in chats_query]
+    
+    return orjson.dumps({
+        "entries": entries,
+        "count": len(entries),
+        "total": total,
+        "available": True,
+        "source": "postgresql"
+    })
+
 @app.get("/api/vector-db")
 async def get_vector_db_entries(
+    request: Request,
+    limit: Optional[int] = None,
+    offset: int = 0,
     db: Session = Depends(get_db),
     user_id: Optional[int] = Depends(get_current_user_id_optional)
 ):
-    """Get all chat entries from PostgreSQL database (replaces ChromaDB)."""
+    """Get chat entries from PostgreSQL database (replaces ChromaDB).
+
+    limit/offset page through chats (most recent first) in SQL; without limit all chats are returned.
+    Clients sending Accept: application/x-ndjson get one entry per line, streamed in batches.
+    """
     try:
-        from core.db_models import ChatMessage
-        from sqlalchemy import func, and_
         
         # Default to admin if no auth
         if user_id is None:
             user_id = 1
         
-        # Get all chats grouped by chat_id
-        chats_query = db.query(
-            ChatMessage.chat_id,
-            func.min(ChatMessage.created_at).label('first_message'),
-            func.max(ChatMessage.created_at).label('last_message'),
-            func.count(ChatMessage.id).label('message_count')
-        ).filter(
-            ChatMessage.user_id == user_id
-        ).group_by(
-            ChatMessage.chat_id
-        ).order_by(
-            func.max(ChatMessage.created_at).desc()
-        ).all()
+        if "application/x-ndjson" in request.headers.get("accept", ""):
+            return StreamingResponse(_stream_chat_entries(user_id), media_type="application/x-ndjson")
         
-        # Format for UI
-        entries = []
-        for chat in chats_query:
-            # Get first user message for preview
-            first_msg = db.query(ChatMessage).filter(
-                and_(
-                    ChatMessage.chat_id == chat.chat_id,
-                    ChatMessage.user_id == user_id,
-                    ChatMessage.role == "user"
-                )
-            ).order_by(ChatMessage.message_index).first()
-            
-            preview = first_msg.content[:100] if first_msg else "No preview"
-            archetype = first_msg.msg_metadata.get("archetype", "unknown") if first_msg and first_msg.msg_metadata else "unknown"
-            
-            entries.append({
-                "id": chat.chat_id,
-                "preview": preview,
-                "message_count": chat.message_count,
-                "archetype": archetype,
-                "metadata": {
-                    "first_message": chat.first_message.isoformat() if chat.first_message else None,
-                    "last_message": chat.last_message.isoformat() if chat.last_message else None
-                }
-            })
+        # Repeated polls of the full list within the TTL reuse the serialized body without querying
+        cached = _vector_db_list_cache.get(user_id) if limit is None else None
+        if cached and time.monotonic() - cached[0] < VECTOR_DB_LIST_TTL:
+            return with_etag(request, Response(content=cached[1], media_type="application/json"), cached[2])
         
-        return JSONResponse(content={
-            "entries": entries,
-            "count": len(entries),
-            "available": True,
-            "source": "postgresql"
-        })
+        # Queries run in a worker thread, off the event loop
+        body = await asyncio.to_thread(build_vector_db_list, db, user_id, limit, offset)
+        etag = body_etag(body)
+        if limit is None:
+            store_vector_db_list(user_id, body, etag)
+        return with_etag(request, Response(content=body, media_type="application/json"), etag)
     except Exception as e:
         logger.error(f"Error getting chat entries: {e}", exc_info=True)
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "entries": [],
             "count": 0,
             "error": f"Error getting entries: {str(e)}",
             "available": False
         })
 
+def search_vector_db_chats(db: Session, user_id: int, query: str, n_results: int) -> tuple:
+    """Semantic (pgvector) chat search with a substring fallback; returns (results, source) (blocking)."""
+    # Try semantic search first if pgvector available
+    results = []
+    source = "postgresql"
+    try:
+        if is_pgvector_enabled(db):
+            sem = search_semantic(db, user_id=user_id, query=query, n_results=n_results)
+            if sem:
+                # Enrich with archetype preview
+                for item in sem:
+                    first_msg = db.query(ChatMessage).filter(
+                        and_(ChatMessage.chat_id == item["chat_id"], ChatMessage.user_id == user_id)
+                    ).order_by(ChatMessage.message_index).first()
+                    archetype = first_msg.msg_metadata.get("archetype", "unknown") if first_msg and first_msg.msg_metadata else "unknown"
+                    results.append({
+                        "chat_id": item["chat_id"],
+                        "text": item["text"][:200] if item.get("text") else "",
+                        "archetype": archetype,
+                        "timestamp": item.get("timestamp"),
+                        "relevance": item.get("relevance", 0.0)
+                    })
+                source = "pgvector"
+    except Exception as _e:
+        logger.debug(f"Semantic search failed, fallback to LIKE: {_e}")
+
+    # Fallback: simple LIKE search if semantic empty
+    if not results:
+        matching_messages = db.query(
+            ChatMessage.chat_id,
+            func.max(ChatMessage.created_at).label('last_message')
+        ).filter(
+            and_(
+                ChatMessage.user_id == user_id,
+                ChatMessage.content.icontains(query, autoescape=True)
+            )
+        ).group_by(
+            ChatMessage.chat_id
+        ).order_by(
+            func.max(ChatMessage.created_at).desc()
+        ).limit(n_results).all()
+
+        for match in matching_messages:
+            first_msg = db.query(ChatMessage).filter(
+                and_(
+                    ChatMessage.chat_id == match.chat_id,
+                    ChatMessage.user_id == user_id
+                )
+            ).order_by(ChatMessage.message_index).first()
+            if first_msg:
+                results.append({
+                    "chat_id": match.chat_id,
+                    "text": first_msg.content[:200],
+                    "archetype": first_msg.msg_metadata.get("archetype", "unknown") if first_msg.msg_metadata else "unknown",
+                    "timestamp": match.last_message.isoformat() if match.last_message else None,
+                    "relevance": 0.5
+                })
+    return results, source
+
 @app.get("/api/vector-db/search")
 async def search_vector_db(
     query: str = None,
@@ -1071,70 +1635,14 @@ async def search_vector_db(
         if not query:
             raise HTTPException(status_code=400, detail="Query parameter is required")
         
-        from core.db_models import ChatMessage
-        from sqlalchemy import or_, func, and_
         
         # Default to admin if no auth
         if user_id is None:
             user_id = 1
-        # Try semantic search first if pgvector available
-        results = []
-        source = "postgresql"
-        try:
-            if is_pgvector_enabled(db):
-                sem = search_semantic(db, user_id=user_id, query=query, n_results=int(n_results))
-                if sem:
-                    # Enrich with archetype preview
-                    for item in sem:
-                        first_msg = db.query(ChatMessage).filter(
-                            and_(ChatMessage.chat_id == item["chat_id"], ChatMessage.user_id == user_id)
-                        ).order_by(ChatMessage.message_index).first()
-                        archetype = first_msg.msg_metadata.get("archetype", "unknown") if first_msg and first_msg.msg_metadata else "unknown"
-                        results.append({
-                            "chat_id": item["chat_id"],
-                            "text": item["text"][:200] if item.get("text") else "",
-                            "archetype": archetype,
-                            "timestamp": item.get("timestamp"),
-                            "relevance": item.get("relevance", 0.0)
-                        })
-                    source = "pgvector"
-        except Exception as _e:
-            logger.debug(f"Semantic search failed, fallback to LIKE: {_e}")
-
-        # Fallback: simple LIKE search if semantic empty
-        if not results:
-            query_lower = f"%{query.lower()}%"
-            matching_messages = db.query(
-                ChatMessage.chat_id,
-                func.max(ChatMessage.created_at).label('last_message')
-            ).filter(
-                and_(
-                    ChatMessage.user_id == user_id,
-                    ChatMessage.content.ilike(query_lower)
-                )
-            ).group_by(
-                ChatMessage.chat_id
-            ).order_by(
-                func.max(ChatMessage.created_at).desc()
-            ).limit(n_results).all()
-
-            for match in matching_messages:
-                first_msg = db.query(ChatMessage).filter(
-                    and_(
-                        ChatMessage.chat_id == match.chat_id,
-                        ChatMessage.user_id == user_id
-                    )
-                ).order_by(ChatMessage.message_index).first()
-                if first_msg:
-                    results.append({
-                        "chat_id": match.chat_id,
-                        "text": first_msg.content[:200],
-                        "archetype": first_msg.msg_metadata.get("archetype", "unknown") if first_msg.msg_metadata else "unknown",
-                        "timestamp": match.last_message.isoformat() if match.last_message else None,
-                        "relevance": 0.5
-                    })
+        # Semantic search and the LIKE fallback both query the database: run them in a worker thread
+        results, source = await asyncio.to_thread(search_vector_db_chats, db, user_id, query, int(n_results))
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "results": results,
             "query": query,
             "available": True,
@@ -1144,7 +1652,7 @@ async def search_vector_db(
         raise
     except Exception as e:
         logger.error(f"Error searching chats: {e}", exc_info=True)
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "results": [],
             "query": query,
             "error": f"Error searching: {str(e)}",
@@ -1152,62 +1660,74 @@ async def search_vector_db(
         })
 
 
+def load_vector_db_entry(db: Session, chat_id: str, user_id: int) -> Optional[bytes]:
+    """Serialized chat with all its messages, or None if the chat does not exist (blocking)."""
+    # Get all messages for this chat (only the columns the response uses)
+    messages = db.query(
+        ChatMessage.role,
+        ChatMessage.content,
+        ChatMessage.msg_metadata,
+        ChatMessage.created_at
+    ).filter(
+        and_(
+            ChatMessage.chat_id == chat_id,
+            ChatMessage.user_id == user_id
+        )
+    ).order_by(ChatMessage.message_index).all()
+    
+    if not messages:
+        return None
+    
+    # Format messages
+    formatted_messages = []
+    chat_metadata = {}
+    
+    for msg in messages:
+        formatted_messages.append({
+            "role": msg.role,
+            "content": msg.content,
+            "timestamp": msg.created_at.isoformat() if msg.created_at else None
+        })
+        
+        # Extract metadata from first message
+        if not chat_metadata and msg.msg_metadata:
+            chat_metadata = msg.msg_metadata.copy()
+    
+    # Create document preview with real newlines (not escaped)
+    document = "\n\n".join([f"{msg['role'].upper()}: {msg['content']}" for msg in formatted_messages])
+    
+    return orjson.dumps({
+        "id": chat_id,
+        "metadata": chat_metadata,
+        "document": document,
+        "messages": formatted_messages,
+        "message_count": len(formatted_messages),
+        "source": "postgresql"
+    })
+
 @app.get("/api/vector-db/{chat_id}")
 async def get_vector_db_entry(
     chat_id: str,
+    request: Request,
     db: Session = Depends(get_db),
     user_id: Optional[int] = Depends(get_current_user_id_optional)
 ):
     """Get specific chat from PostgreSQL database by chat_id."""
     try:
-        from core.db_models import ChatMessage
-        from sqlalchemy import and_
         
         # Default to admin if no auth
         if user_id is None:
             user_id = 1
         
-        # Get all messages for this chat
-        messages = db.query(ChatMessage).filter(
-            and_(
-                ChatMessage.chat_id == chat_id,
-                ChatMessage.user_id == user_id
-            )
-        ).order_by(ChatMessage.message_index).all()
-        
-        if not messages:
+        # Query runs in a worker thread, off the event loop
+        body = await asyncio.to_thread(load_vector_db_entry, db, chat_id, user_id)
+        if body is None:
             raise HTTPException(status_code=404, detail="Chat not found")
         
-        # Format messages
-        formatted_messages = []
-        chat_metadata = {}
-        
-        for msg in messages:
-            formatted_messages.append({
-                "role": msg.role,
-                "content": msg.content,
-                "timestamp": msg.created_at.isoformat() if msg.created_at else None
-            })
-            
-            # Extract metadata from first message
-            if not chat_metadata and msg.msg_metadata:
-                chat_metadata = msg.msg_metadata.copy()
-        
-        # Create document preview with real newlines (not escaped)
-        document = "\n\n".join([f"{msg['role'].upper()}: {msg['content']}" for msg in formatted_messages])
-        
-        return JSONResponse(content={
-            "id": chat_id,
-            "metadata": chat_metadata,
-            "document": document,
-            "messages": formatted_messages,
-            "message_count": len(formatted_messages),
-            "source": "postgresql"
-        })
+        return with_etag(request, Response(content=body, media_type="application/json"))
     except HTTPException:
         raise
     except Exception as e:
-        import uuid
         err_id = str(uuid.uuid4())
         logger.error(f"[chat_fetch_error] id={err_id} chat_id={chat_id} user_id={user_id} error={e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error reading entry (id={err_id}): {str(e)}")
@@ -1220,39 +1740,20 @@ async def delete_vector_db_entry(
 ):
     """Delete all messages for a chat from PostgreSQL database."""
     try:
-        from core.db_models import ChatMessage, ChatEmbedding
-        from sqlalchemy import and_
 
         # Default to admin if no auth
         if user_id is None:
             user_id = 1
 
-        # Delete related embeddings first
-        logger.info(f"Attempting to delete embeddings for chat ID: {chat_id} and user: {user_id}")
-        db.query(ChatEmbedding).filter(
-            and_(
-                ChatEmbedding.chat_id == chat_id,
-                ChatEmbedding.user_id == user_id
-            )
-        ).delete()
-
-        # Delete all messages for this chat
-        logger.info(f"Attempting to delete vector DB entry for chat ID: {chat_id} and user: {user_id}")
-        deleted = db.query(ChatMessage).filter(
-            and_(
-                ChatMessage.chat_id == chat_id,
-                ChatMessage.user_id == user_id
-            )
-        ).delete()
-
-        db.commit()
+        deleted = await asyncio.to_thread(delete_chat_rows, db, chat_id, user_id)
+        invalidate_vector_db_list(user_id)
 
         if deleted == 0:
             raise HTTPException(status_code=404, detail="Chat not found")
 
         logger.info(f"Deleted {deleted} messages from chat {chat_id}")
 
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success",
             "message": f"Chat {chat_id} deleted ({deleted} messages)",
             "source": "postgresql"
@@ -1263,6 +1764,30 @@ async def delete_vector_db_entry(
         logger.error(f"Error deleting vector DB entry for chat ID {chat_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error deleting entry: {str(e)}")
 
+def update_assistant_message(db: Session, chat_id: str, user_id: int, document: str, metadata: Optional[dict]) -> Optional[int]:
+    """Replace the chat's first assistant message and commit (blocking); returns its id, or None if there is none."""
+    try:
+        # Find the first assistant message of this chat (main response)
+        assistant_message = db.query(ChatMessage).filter(
+            and_(
+                ChatMessage.chat_id == chat_id,
+                ChatMessage.user_id == user_id,
+                ChatMessage.role == "assistant"
+            )
+        ).order_by(ChatMessage.message_index).first()
+        
+        if not assistant_message:
+            return None
+        
+        assistant_message.content = document
+        if metadata is not None:
+            assistant_message.msg_metadata = metadata
+        db.commit()
+        return assistant_message.id
+    except Exception:
+        db.rollback()
+        raise
+
 @app.post("/api/vector-db/{chat_id}")
 async def update_vector_db_entry(
     chat_id: str, 
@@ -1272,48 +1797,33 @@ async def update_vector_db_entry(
 ):
     """Update chat in PostgreSQL database (updates assistant response)."""
     try:
-        from core.db_models import ChatMessage
-        from sqlalchemy import and_
         
         # Default to admin if no auth
         if user_id is None:
             user_id = 1
         
-        data = await request.json()
+        data = orjson.loads(await request.body())
         
         document = data.get("document")
         if not document:
             raise HTTPException(status_code=400, detail="Field 'document' is required")
         
-        # Find assistant messages for this chat
-        assistant_messages = db.query(ChatMessage).filter(
-            and_(
-                ChatMessage.chat_id == chat_id,
-                ChatMessage.user_id == user_id,
-                ChatMessage.role == "assistant"
-            )
-        ).order_by(ChatMessage.message_index).all()
-        
-        if not assistant_messages:
-            raise HTTPException(status_code=404, detail="Chat not found or has no assistant messages")
-        
-        # Update the first assistant message (main response)
-        assistant_messages[0].content = document
         # Optionally update metadata if provided
         metadata = data.get("metadata")
-        if isinstance(metadata, dict):
-            assistant_messages[0].msg_metadata = metadata
-        db.commit()
+        message_id = await asyncio.to_thread(
+            update_assistant_message, db, chat_id, user_id, document,
+            metadata if isinstance(metadata, dict) else None
+        )
+        if message_id is None:
+            raise HTTPException(status_code=404, detail="Chat not found or has no assistant messages")
+        invalidate_vector_db_list(user_id)
         
         logger.info(f"Updated assistant message in chat {chat_id} for user {user_id}")
         
-        # Reindex updated assistant message
-        try:
-            index_message(db, assistant_messages[0])
-        except Exception as _e:
-            logger.debug(f"Reindex after update failed: {_e}")
+        # Reindex updated assistant message in the background
+        await schedule_index(user_id, chat_id, message_id)
         
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success", 
             "message": f"Entry {chat_id} updated",
             "source": "postgresql"
@@ -1321,43 +1831,49 @@ async def update_vector_db_entry(
     except HTTPException:
         raise
     except Exception as e:
-        db.rollback()
         logger.error(f"Error updating chat {chat_id}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error updating entry: {str(e)}")
 
 # --- API for file upload and processing ---
+def file_too_large_error() -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024:.1f}MB"
+    )
+
+def save_upload(src, dest_path: str) -> int:
+    """Copy an upload to dest_path in fixed-size chunks (blocking); returns the byte count.
+
+    Stops and removes the partial file as soon as MAX_FILE_SIZE is exceeded.
+    """
+    total = 0
+    with open(dest_path, "wb") as out:
+        while chunk := src.read(UPLOAD_CHUNK_SIZE):
+            total += len(chunk)
+            if total > MAX_FILE_SIZE:
+                break
+            out.write(chunk)
+    if total > MAX_FILE_SIZE:
+        os.remove(dest_path)
+        raise file_too_large_error()
+    return total
+
 @app.post("/api/files/upload")
 async def upload_file(
     file: UploadFile = File(...),
     db: Session = Depends(get_db),
-    user_id: Optional[int] = Depends(get_current_user_id_optional)
+    user_id: Optional[int] = Depends(get_current_user_id_optional),
+    processor=Depends(get_file_processor)
 ):
     """Upload and process a text file; store chunks in PostgreSQL (no vector DB)."""
     try:
-        from core.file_processor import process_file, is_file_supported, get_supported_extensions
-        import datetime
-        from core.db_models import ChatMessage
-        from sqlalchemy import and_
-
         # Default to admin if no auth
         if user_id is None:
             user_id = 1
         
-        # Validate file size
-        file_content = await file.read()
-        file_size = len(file_content)
-        
-        if file_size > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=413,
-                detail=f"File too large. Maximum size: {MAX_FILE_SIZE / 1024 / 1024:.1f}MB"
-            )
-        
-        if file_size == 0:
-            raise HTTPException(
-                status_code=400,
-                detail="File is empty"
-            )
+        # Reject by declared size before touching the body (re-checked while copying)
+        if file.size is not None and file.size > MAX_FILE_SIZE:
+            raise file_too_large_error()
         
         # Validate MIME type
         if file.content_type and file.content_type not in ALLOWED_MIME_TYPES:
@@ -1367,32 +1883,38 @@ async def upload_file(
             )
         
         # Check if file extension is supported
-        if not is_file_supported(file.filename):
-            supported = ", ".join(get_supported_extensions())
+        if not processor.is_file_supported(file.filename):
+            supported = ", ".join(processor.get_supported_extensions())
             raise HTTPException(
                 status_code=400,
                 detail=f"Unsupported file extension. Supported: {supported}"
             )
         
-        # Save uploaded file temporarily (content already read for validation)
+        # Stream the upload to disk in chunks instead of buffering it whole
         file_path = os.path.join(UPLOAD_DIR, file.filename)
-        with open(file_path, "wb") as f:
-            f.write(file_content)
+        file_size = await asyncio.to_thread(save_upload, file.file, file_path)
+        
+        if file_size == 0:
+            await aiofiles.os.remove(file_path)
+            raise HTTPException(
+                status_code=400,
+                detail="File is empty"
+            )
         
         logger.info(f"File uploaded: {file.filename} ({file_size} bytes, {file.content_type})")
         
         # Process file into chunks
-        chunks = process_file(file_path, chunk_size=1000, chunk_overlap=200)
+        chunks = processor.process_file(file_path, chunk_size=1000, chunk_overlap=200)
         
         if not chunks:
-            os.remove(file_path)
+            await aiofiles.os.remove(file_path)
             raise HTTPException(
                 status_code=400,
                 detail="File is empty or contains no text"
             )
         
         # Persist chunks as messages in DB under a synthetic chat
-        timestamp = datetime.datetime.now().isoformat()
+        timestamp = datetime.now().isoformat()
         chat_id = f"file_{file.filename}"
 
         # Determine next message_index for this chat
@@ -1422,43 +1944,37 @@ async def upload_file(
             next_index += 1
             saved_count += 1
         db.commit()
+        invalidate_vector_db_list(user_id)
         
         logger.info(f"File processed: {file.filename} -> {saved_count} chunks saved to DB (chat_id={chat_id})")
         
-        # Index saved file chunks (semantic embeddings)
+        # Index saved file chunks (semantic embeddings) in the background
         try:
-            # Fetch recent file-role messages for this upload timestamp
-            file_msgs = db.query(ChatMessage).filter(
+            file_msg_ids = db.query(ChatMessage.id).filter(
                 and_(
                     ChatMessage.chat_id == chat_id,
                     ChatMessage.user_id == user_id,
                     ChatMessage.role == "file"
                 )
             ).order_by(ChatMessage.message_index).all()
-            for m in file_msgs:
-                try:
-                    index_message(db, m)
-                except Exception as _e:
-                    logger.debug(f"Indexing file chunk failed: {_e}")
+            for (message_id,) in file_msg_ids:
+                await schedule_index(user_id, chat_id, message_id)
         except Exception as _e:
             logger.debug(f"Collecting file messages for indexing failed: {_e}")
         
-        # Ensure content is defined
-        if 'content' not in locals():
-            content = file.file.read() if hasattr(file, 'file') else b''
-
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success",
             "message": f"File '{file.filename}' processed and saved",
             "filename": file.filename,
             "chat_id": chat_id,
             "chunks_count": saved_count,
-            "file_size": len(content)
+            "file_size": file_size
         })
         
     except HTTPException:
         raise
     except ImportError as e:
+        # Optional readers (python-docx, PyPDF2) are imported on first use
         logger.error(f"Import error: {e}", exc_info=True)
         raise HTTPException(
             status_code=500,
@@ -1467,9 +1983,9 @@ async def upload_file(
     except Exception as e:
         logger.error(f"Error processing file: {e}", exc_info=True)
         # Clean up uploaded file if exists
-        if 'file_path' in locals() and os.path.exists(file_path):
+        if 'file_path' in locals() and await aiofiles.os.path.exists(file_path):
             try:
-                os.remove(file_path)
+                await aiofiles.os.remove(file_path)
             except Exception:
                 pass
         raise HTTPException(
@@ -1487,7 +2003,7 @@ async def semantic_reindex(
     try:
         if user_id != 1:
             raise HTTPException(status_code=403, detail="Admin only")
-        payload = await request.json()
+        payload = orjson.loads(await request.body())
         all_flag = bool(payload.get("all", False))
         dry_run = bool(payload.get("dry_run", False))
         batch_size = int(payload.get("batch_size", 500))
@@ -1497,7 +2013,6 @@ async def semantic_reindex(
                 target_user_id = int(target_user_id)
             except ValueError:
                 raise HTTPException(status_code=400, detail="target_user_id must be int")
-        from core.semantic_search import reindex_embeddings
         stats = reindex_embeddings(
             db,
             user_id=target_user_id,
@@ -1505,7 +2020,7 @@ async def semantic_reindex(
             dry_run=dry_run,
             batch_size=batch_size
         )
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success",
             "admin_user": user_id,
             "target_user_id": target_user_id,
@@ -1523,11 +2038,9 @@ async def semantic_reindex(
 @app.get("/api/files/supported")
 async def get_supported_file_types():
     """Get list of supported file types."""
-    try:
-        from core.file_processor import get_supported_extensions
-        extensions = get_supported_extensions()
-        return JSONResponse(content={
-            "supported_extensions": extensions,
+    if file_processor is not None:
+        return ORJSONResponse(content={
+            "supported_extensions": file_processor.get_supported_extensions(),
             "supported_types": {
                 ".txt": "Plain text",
                 ".md": "Markdown",
@@ -1535,29 +2048,28 @@ async def get_supported_file_types():
                 ".pdf": "PDF document"
             }
         })
-    except ImportError:
-        return JSONResponse(content={
-            "supported_extensions": [".txt", ".md"],
-            "supported_types": {
-                ".txt": "Plain text",
-                ".md": "Markdown"
-            },
-            "note": "Full file processing not available"
-        })
+    return ORJSONResponse(content={
+        "supported_extensions": [".txt", ".md"],
+        "supported_types": {
+            ".txt": "Plain text",
+            ".md": "Markdown"
+        },
+        "note": "Full file processing not available"
+    })
 
 # --- API for server shutdown ---
 @app.post("/api/set-language")
 async def set_language(request: Request):
     """Set user's preferred language."""
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         language = data.get("language", DEFAULT_LANGUAGE)
         
         if language not in SUPPORTED_LANGUAGES:
             language = DEFAULT_LANGUAGE
         
         # Create response with cookie
-        response = JSONResponse(content={
+        response = ORJSONResponse(content={
             "status": "success",
             "language": language
         })
@@ -1577,97 +2089,79 @@ async def set_language(request: Request):
         logger.error(f"Error setting language: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+# Seconds a graceful stop may take before the process is forced to exit
+SHUTDOWN_TIMEOUT = 5.0
+
+def _force_exit_if_stuck():
+    """Last resort: exit the process if the server has not stopped within SHUTDOWN_TIMEOUT."""
+    if _shutdown_event is not None:
+        if _shutdown_event.wait(timeout=SHUTDOWN_TIMEOUT):
+            return
+    else:
+        time.sleep(SHUTDOWN_TIMEOUT)
+    logger.warning("Server did not stop within %.0fs, forcing exit", SHUTDOWN_TIMEOUT)
+    os._exit(0)
+
+async def request_shutdown():
+    """
+    Stop the server gracefully once the shutdown response has been sent.
+
+    The desktop launcher registers its uvicorn Server, which is told to exit and whose
+    thread then returns normally (lifespan shutdown and atexit handlers still run).
+    Otherwise SIGTERM is raised so uvicorn's own signal handling stops the server.
+    """
+    if _server_instance is not None and hasattr(_server_instance, 'should_exit'):
+        _server_instance.should_exit = True
+        logger.info("Server shutdown signal sent")
+        # Daemon watchdog: ends with the process if the graceful stop succeeds
+        threading.Thread(target=_force_exit_if_stuck, daemon=True).start()
+    else:
+        logger.info("Raising SIGTERM for graceful shutdown")
+        signal.raise_signal(signal.SIGTERM)
+
 @app.post("/api/shutdown")
 async def shutdown_server():
     """Shutdown the server."""
     try:
-        global _server_instance, _shutdown_event
-        
-        # Run shutdown in separate thread
-        def do_shutdown():
-            import time
-            # Give time to send HTTP response
-            time.sleep(0.5)
-            
-            # Try graceful shutdown through server instance
-            if _server_instance:
-                try:
-                    logger.info("Initiating graceful shutdown...")
-                    # Uvicorn Server has should_exit attribute for graceful shutdown
-                    if hasattr(_server_instance, 'should_exit'):
-                        _server_instance.should_exit = True
-                        logger.info("Server shutdown signal sent")
-                    
-                    # Wait for server to shut down gracefully
-                    # This allows connections to close and port to be released
-                    max_wait = 5
-                    for i in range(max_wait * 2):
-                        # Check if server is still running
-                        if hasattr(_server_instance, 'should_exit'):
-                            # Server should exit when should_exit is True
-                            pass
-                        time.sleep(0.5)
-                        if i % 2 == 0:
-                            logger.debug(f"Waiting for server shutdown... ({i//2 + 1}/{max_wait}s)")
-                    
-                    # Also try shutdown through server.shutdown() if available
-                    if hasattr(_server_instance, 'shutdown'):
-                        try:
-                            logger.info("Calling server.shutdown()...")
-                            _server_instance.shutdown()
-                            time.sleep(1)
-                        except Exception as e:
-                            logger.debug(f"Server.shutdown() error (may be expected): {e}")
-                    
-                    # Additional wait to ensure port is released
-                    logger.info("Waiting for port to be released...")
-                    time.sleep(1)
-                except Exception as e:
-                    logger.error(f"Error in graceful shutdown: {e}", exc_info=True)
-            
-            # Give time for port to be released before exit
-            # TIME_WAIT state typically lasts 30-120 seconds, but we wait a bit
-            logger.info("Shutdown complete, exiting process")
-            time.sleep(0.5)
-            
-            # Always exit process through os._exit(0)
-            # This ensures process will exit even if graceful shutdown failed
-            os._exit(0)
-        
-        # Run shutdown in separate thread (not daemon, so process doesn't exit before shutdown)
-        shutdown_thread = threading.Thread(target=do_shutdown, daemon=False)
-        shutdown_thread.start()
-        
         # Send response
         logger.info("Shutdown requested via API")
         increment_counter("shutdown_requests")
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success",
             "message": "Server is shutting down..."
-        })
+        }, background=BackgroundTask(request_shutdown))
     except Exception as e:
-        logger.error(f"Error shutting down server: {e}", exc_info=True)
+        logger.error("Error shutting down server: %s", e, exc_info=True)
         increment_counter("api_errors")
         raise HTTPException(status_code=500, detail=f"Error shutting down server: {str(e)}")
 
 # --- API for language settings ---
+# GET /api/language bodies are constant per language, so serialize them once
+_language_bodies = {
+    language: orjson.dumps({"language": language, "supported_languages": SUPPORTED_LANGUAGES})
+    for language in SUPPORTED_LANGUAGES
+}
+
 @app.get("/api/language")
 async def get_language(request: Request):
     """Get current language setting."""
     language = get_user_language(request)
-    return JSONResponse(content={"language": language, "supported_languages": SUPPORTED_LANGUAGES})
+    body = _language_bodies.get(language)
+    if body is None:
+        body = orjson.dumps({"language": language, "supported_languages": SUPPORTED_LANGUAGES})
+    return Response(content=body, media_type="application/json")
 
 @app.post("/api/language")
 async def set_language(request: Request):
     """Set language preference."""
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         language = data.get("language", DEFAULT_LANGUAGE)
         
         if language not in SUPPORTED_LANGUAGES:
             raise HTTPException(status_code=400, detail=f"Unsupported language: {language}")
         
-        response = JSONResponse(content={"status": "success", "language": language})
+        response = ORJSONResponse(content={"status": "success", "language": language})
         response.set_cookie(key="language", value=language, max_age=365*24*60*60)  # 1 year
         increment_counter("language_changes")
         return response
@@ -1688,7 +2182,6 @@ async def get_metrics():
         
         # Add cache statistics
         try:
-            from core.cache import get_cache_stats
             metrics["cache"] = get_cache_stats()
         except Exception as e:
             logger.debug(f"Error getting cache stats: {e}")
@@ -1705,7 +2198,7 @@ async def get_metrics():
         
         # Add history statistics
         try:
-            history_files = [f for f in os.listdir(HISTORY_DIR) if f.endswith('.json')]
+            history_files = await asyncio.to_thread(list_history_files)
             metrics["history"] = {
                 "total_chats": len(history_files),
                 "history_dir": HISTORY_DIR
@@ -1716,15 +2209,12 @@ async def get_metrics():
         
         # Add chat storage statistics (PostgreSQL)
         try:
-            from sqlalchemy.orm import Session as _Sess
-            from core.db_models import ChatMessage, ChatEmbedding
             # Create an ad-hoc session for counting (metrics is fast path)
-            db2: _Sess = next(get_db())
+            db2: Session = next(get_db())
             try:
                 total_chats = db2.query(ChatMessage.chat_id).distinct().count()
                 total_messages = db2.query(ChatMessage).count()
                 # Eligible for embeddings (assistant + file)
-                from sqlalchemy import func
                 eligible_messages = db2.query(func.count(ChatMessage.id)).filter(ChatMessage.role.in_(["assistant", "file"])).scalar() or 0
                 total_embeddings = db2.query(func.count(ChatEmbedding.id)).scalar() or 0
             finally:
@@ -1749,7 +2239,7 @@ async def get_metrics():
                 "error": str(e)
             }
         
-        return JSONResponse(content=metrics)
+        return ORJSONResponse(content=metrics)
     except Exception as e:
         logger.error(f"Error getting metrics: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error getting metrics: {str(e)}")
@@ -1763,12 +2253,11 @@ async def reset_metrics_endpoint():
         
         # Also reset cache stats if requested
         try:
-            from core.cache import reset_cache_stats
             reset_cache_stats()
         except Exception:
             pass
         
-        return JSONResponse(content={"status": "success", "message": "Metrics reset"})
+        return ORJSONResponse(content={"status": "success", "message": "Metrics reset"})
     except Exception as e:
         logger.error(f"Error resetting metrics: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error resetting metrics: {str(e)}")
@@ -1778,9 +2267,8 @@ async def reset_metrics_endpoint():
 async def get_cache_stats_endpoint():
     """Get cache statistics."""
     try:
-        from core.cache import get_cache_stats
         stats = get_cache_stats()
-        return JSONResponse(content=stats)
+        return ORJSONResponse(content=stats)
     except Exception as e:
         logger.error(f"Error getting cache stats: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error getting cache stats: {str(e)}")
@@ -1789,9 +2277,8 @@ async def get_cache_stats_endpoint():
 async def clear_cache_endpoint():
     """Clear the cache."""
     try:
-        from core.cache import clear_cache
         clear_cache()
-        return JSONResponse(content={"status": "success", "message": "Cache cleared"})
+        return ORJSONResponse(content={"status": "success", "message": "Cache cleared"})
     except Exception as e:
         logger.error(f"Error clearing cache: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error clearing cache: {str(e)}")
@@ -1800,9 +2287,8 @@ async def clear_cache_endpoint():
 async def clear_expired_cache_endpoint():
     """Clear expired cache entries."""
     try:
-        from core.cache import clear_expired_entries, DEFAULT_TTL
         cleared = clear_expired_entries(ttl=DEFAULT_TTL)
-        return JSONResponse(content={
+        return ORJSONResponse(content={
             "status": "success",
             "message": f"Cleared {cleared} expired entries",
             "cleared_count": cleared
@@ -1812,22 +2298,108 @@ async def clear_expired_cache_endpoint():
         raise HTTPException(status_code=500, detail=f"Error clearing expired cache: {str(e)}")
 
 # --- API for export/import chats ---
+async def _stream_history_export(files: List[str], export_name: str):
+    """Yield the export-all JSON envelope, splicing each history file's bytes in as-is."""
+    yield b'{"format":"json","filename":' + orjson.dumps(export_name) + b',"content":{'
+    total = 0
+    for filename in files:
+        try:
+            raw = await read_history_file(filename)
+            orjson.loads(raw)  # skip corrupt files instead of emitting broken JSON
+        except Exception as e:
+            logger.warning(f"Error reading file {filename}: {e}")
+            continue
+        yield (b"," if total else b"") + orjson.dumps(filename) + b":" + raw.strip()
+        total += 1
+    yield b'},"total_chats":' + str(total).encode() + b"}"
+
+@app.get("/api/history/export/all")
+async def export_all_history(format: str = "json"):
+    """Export all history files as a single file."""
+    try:
+        if not await aiofiles.os.path.exists(HISTORY_DIR):
+            await aiofiles.os.makedirs(HISTORY_DIR, exist_ok=True)
+        
+        files = await asyncio.to_thread(list_history_files)
+        
+        if not files:
+            return ORJSONResponse(content={
+                "format": format,
+                "filename": f"all_chats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}",
+                "content": {} if format.lower() == "json" else "# All Chat History\n\n**No chats found.**\n\n",
+                "total_chats": 0
+            })
+        
+        if format.lower() == "markdown":
+            all_chats = {}
+            for filename in files:
+                try:
+                    all_chats[filename] = orjson.loads(await read_history_file(filename))
+                except Exception as e:
+                    logger.warning(f"Error reading file {filename}: {e}")
+                    continue
+            
+            # Convert all to Markdown
+            markdown_content = f"# All Chat History\n\n"
+            markdown_content += f"**Exported:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+            markdown_content += f"**Total Chats:** {len(all_chats)}\n\n"
+            markdown_content += "---\n\n"
+            
+            for filename, data in all_chats.items():
+                markdown_content += f"## {filename}\n\n"
+                
+                if isinstance(data, list):
+                    for i, msg in enumerate(data, 1):
+                        markdown_content += f"### Message {i}\n\n"
+                        markdown_content += f"**Archetype:** {msg.get('archetype', 'N/A')}\n\n"
+                        markdown_content += f"**User:**\n{msg.get('user_input', '')}\n\n"
+                        markdown_content += f"**Assistant:**\n{msg.get('model_response', '')}\n\n"
+                elif isinstance(data, dict):
+                    markdown_content += f"**Question:** {data.get('user_input', 'N/A')}\n\n"
+                    if data.get('type') == 'rada':
+                        if data.get('consensus'):
+                            markdown_content += f"**Consensus:**\n{data['consensus']}\n\n"
+                
+                markdown_content += "---\n\n"
+            
+            return ORJSONResponse(content={
+                "format": "markdown",
+                "filename": f"all_chats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
+                "content": markdown_content,
+                "total_chats": len(all_chats)
+            })
+        else:
+            # JSON format: stream file bodies into the envelope one at a time
+            export_name = f"all_chats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+            return StreamingResponse(
+                _stream_history_export(files, export_name),
+                media_type="application/json"
+            )
+    except Exception as e:
+        logger.error(f"Error exporting all history: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Error exporting history: {str(e)}")
+
 @app.get("/api/history/export/{filename}")
 async def export_history_file(filename: str, format: str = "json"):
-    """Export a history file in specified format (json or markdown)."""
-    if "/" in filename or "\\" in filename or ".." in filename:
+    """Export a history file in specified format (json, markdown, or raw file download)."""
+    if _BAD_FILENAME_RE.search(filename):
         raise HTTPException(status_code=400, detail="Invalid filename")
     
+    if format.lower() == "raw":
+        # Pure passthrough: let the server send the file as-is (sendfile where available)
+        filepath = os.path.join(HISTORY_DIR_ABS, filename)
+        if not await aiofiles.os.path.isfile(filepath):
+            raise HTTPException(status_code=404, detail="File not found")
+        return FileResponse(filepath, media_type="application/json", filename=filename)
+    
     try:
-        filepath = os.path.join(HISTORY_DIR, filename)
-        if not os.path.exists(filepath):
+        try:
+            raw = await read_history_file(filename)
+        except FileNotFoundError:
             raise HTTPException(status_code=404, detail="File not found")
         
-        async with aiofiles.open(filepath, "r", encoding="utf-8") as f:
-            content = await f.read()
-            data = json.loads(content)
-        
         if format.lower() == "markdown":
+            data = orjson.loads(raw)
             # Convert to Markdown format
             markdown_content = f"# Chat History: {filename}\n\n"
             markdown_content += f"**Exported:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
@@ -1861,101 +2433,38 @@ async def export_history_file(filename: str, format: str = "json"):
                         markdown_content += "### Consensus\n\n"
                         markdown_content += f"{data['consensus']}\n\n"
             
-            return JSONResponse(content={
+            return ORJSONResponse(content={
                 "format": "markdown",
                 "filename": filename.replace('.json', '.md'),
                 "content": markdown_content
             })
         else:
-            # JSON format
-            return JSONResponse(content={
-                "format": "json",
-                "filename": filename,
-                "content": data
-            })
+            # JSON format: the file is already JSON on disk, so splice its bytes
+            # into the envelope instead of re-serializing them, once they parse
+            try:
+                orjson.loads(raw)
+            except orjson.JSONDecodeError as e:
+                logger.error(f"History file {filename} is not valid JSON: {e}")
+                raise HTTPException(status_code=500, detail=f"Error exporting file: {filename} is not valid JSON")
+            body = b"".join((
+                b'{"format":"json","filename":',
+                orjson.dumps(filename),
+                b',"content":',
+                raw.strip(),
+                b"}",
+            ))
+            return Response(content=body, media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error exporting history file: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error exporting file: {str(e)}")
 
-@app.get("/api/history/export/all")
-async def export_all_history(format: str = "json"):
-    """Export all history files as a single file."""
-    try:
-        if not os.path.exists(HISTORY_DIR):
-            os.makedirs(HISTORY_DIR, exist_ok=True)
-        
-        files = [f for f in os.listdir(HISTORY_DIR) if f.endswith('.json')]
-        files.sort(reverse=True)
-        
-        if not files:
-            return JSONResponse(content={
-                "format": format,
-                "filename": f"all_chats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{format}",
-                "content": {} if format.lower() == "json" else "# All Chat History\n\n**No chats found.**\n\n",
-                "total_chats": 0
-            })
-        
-        all_chats = {}
-        for filename in files:
-            try:
-                filepath = os.path.join(HISTORY_DIR, filename)
-                async with aiofiles.open(filepath, "r", encoding="utf-8") as f:
-                    content = await f.read()
-                    data = json.loads(content)
-                    all_chats[filename] = data
-            except Exception as e:
-                logger.warning(f"Error reading file {filename}: {e}")
-                continue
-        
-        if format.lower() == "markdown":
-            # Convert all to Markdown
-            markdown_content = f"# All Chat History\n\n"
-            markdown_content += f"**Exported:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-            markdown_content += f"**Total Chats:** {len(all_chats)}\n\n"
-            markdown_content += "---\n\n"
-            
-            for filename, data in all_chats.items():
-                markdown_content += f"## {filename}\n\n"
-                
-                if isinstance(data, list):
-                    for i, msg in enumerate(data, 1):
-                        markdown_content += f"### Message {i}\n\n"
-                        markdown_content += f"**Archetype:** {msg.get('archetype', 'N/A')}\n\n"
-                        markdown_content += f"**User:**\n{msg.get('user_input', '')}\n\n"
-                        markdown_content += f"**Assistant:**\n{msg.get('model_response', '')}\n\n"
-                elif isinstance(data, dict):
-                    markdown_content += f"**Question:** {data.get('user_input', 'N/A')}\n\n"
-                    if data.get('type') == 'rada':
-                        if data.get('consensus'):
-                            markdown_content += f"**Consensus:**\n{data['consensus']}\n\n"
-                
-                markdown_content += "---\n\n"
-            
-            return JSONResponse(content={
-                "format": "markdown",
-                "filename": f"all_chats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md",
-                "content": markdown_content,
-                "total_chats": len(all_chats)
-            })
-        else:
-            # JSON format
-            return JSONResponse(content={
-                "format": "json",
-                "filename": f"all_chats_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
-                "content": all_chats,
-                "total_chats": len(all_chats)
-            })
-    except Exception as e:
-        logger.error(f"Error exporting all history: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Error exporting history: {str(e)}")
-
 @app.post("/api/history/import")
 async def import_history_file(request: Request):
     """Import a history file."""
     try:
-        data = await request.json()
+        data = orjson.loads(await request.body())
         content = data.get("content")
         filename = data.get("filename")
         format_type = data.get("format", "json")
@@ -1964,7 +2473,7 @@ async def import_history_file(request: Request):
             raise HTTPException(status_code=400, detail="Content and filename are required")
         
         # Validate filename
-        if "/" in filename or "\\" in filename or ".." in filename:
+        if _BAD_FILENAME_RE.search(filename):
             raise HTTPException(status_code=400, detail="Invalid filename")
         
         # Ensure .json extension
@@ -6,6 +6,7 @@ TODO: Refactor to modular router structure
 See REFACTORING_GUIDE.md for migration plan
 Priority: MEDIUM (after test coverage reaches 80%)
 """
+import asyncio
 import os
 import sys
 from contextlib import asynccontextmanager
@@ -15,7 +16,8 @@ from typing import Optional
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from fastapi import FastAPI, Depends
+from fastapi import FastAPI, Depends, Request
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
@@ -25,12 +27,17 @@ from fastapi.middleware.gzip import GZipMiddleware
 from core.logger import logger
 from core.settings import settings
 from core.rate_limit import RateLimitMiddleware
+from core.monitoring import CounterBatchMiddleware
 
 # Import authentication
 from core.auth import init_admin_user, get_current_user_id_optional
 
 # Import database
 from core.database import init_database
+from core.index_queue import drain as drain_index_queue
+
+# Import legacy vector DB client once (shim module, always importable)
+from vector_db.client import is_vector_db_available, get_vector_db_type, get_user_collection
 
 # Import original app (includes MAX_FILE_SIZE and ALLOWED_MIME_TYPES)
 from main import app as original_app, MAX_FILE_SIZE, ALLOWED_MIME_TYPES
@@ -47,6 +54,10 @@ async def lifespan(app: FastAPI):
     logger.info(f"[START] Starting BrainAi in {settings.environment.upper()} mode")
     logger.info("=" * 60)
     
+    # Report the loop actually running, not the one that was requested
+    loop_type = type(asyncio.get_running_loop())
+    logger.info("[LOOP] Event loop: %s.%s", loop_type.__module__, loop_type.__qualname__)
+    
     try:
         # Initialize database (PostgreSQL in production, SQLite in development)
         logger.info("[DB] Initializing database...")
@@ -115,6 +126,7 @@ async def lifespan(app: FastAPI):
     logger.info("=" * 60)
     logger.info("[STOP] Shutting down BrainAi...")
     logger.info("=" * 60)
+    await drain_index_queue()
     logger.info("[OK] Application shutdown complete")
 
 
@@ -126,17 +138,21 @@ app = FastAPI(
     docs_url="/docs" if not settings.is_production else None,  # Disable docs in production
     redoc_url="/redoc" if not settings.is_production else None,
     openapi_url="/openapi.json" if not settings.is_production else None,
+    default_response_class=ORJSONResponse,  # orjson for endpoints returning plain dicts/lists
     lifespan=lifespan
 )
 
+# Probe the vector DB once; request handlers read the cached values
+app.state.vector_db_available = is_vector_db_available()
+app.state.vector_db_type = get_vector_db_type()
+
 # === HEALTH CHECK (must be BEFORE middleware) ===
 
 from starlette.responses import PlainTextResponse
 
 @app.get("/health", response_class=PlainTextResponse)
 async def health_check():
-    """Simple health check for Railway."""
-    logger.info("Health check endpoint called")
+    """Simple health check for Railway (polled frequently, so no per-call work)."""
     return "ok"
 
 # === MIDDLEWARE CONFIGURATION ===
@@ -170,14 +186,17 @@ app.add_middleware(
 # 4. GZip Compression
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
+# 5. Per-request counter batching (one counters update per request)
+app.add_middleware(CounterBatchMiddleware)
+
 # === IMPORT ROUTES AND STATIC FILES FROM ORIGINAL APP ===
 
-from fastapi.staticfiles import StaticFiles
+from core.static import CachedStaticFiles
 from core.utils import resource_path
 
-# Mount static files BEFORE copying routes
+# Mount static files BEFORE copying routes (same caching headers as main.py)
 static_dir = resource_path("static")
-app.mount("/static", StaticFiles(directory=static_dir), name="static")
+app.mount("/static", CachedStaticFiles(directory=static_dir, html=False), name="static")
 
 # Copy all routes from original app (except static mount and health check)
 for route in original_app.routes:
@@ -324,15 +343,14 @@ async def reset_admin_password(db: Session = Depends(get_db)):
 
 
 @app.get("/api/debug/vector-db")
-async def debug_vector_db(db: Session = Depends(get_db)):
+async def debug_vector_db(request: Request, db: Session = Depends(get_db)):
     """Debug endpoint to check vector DB status."""
-    from vector_db.client import is_vector_db_available, get_vector_db_type, get_user_collection
     from core.db_models import User
     
     try:
         # Check vector DB availability
-        vdb_available = is_vector_db_available()
-        vdb_type = get_vector_db_type()
+        vdb_available = request.app.state.vector_db_available
+        vdb_type = request.app.state.vector_db_type
         
         # Get current user count
         user_count = db.query(User).count()
@@ -456,7 +474,7 @@ async def get_chat_from_db(chat_id: str, db: Session = Depends(get_db), user_id:
 # === ERROR HANDLERS ===
 
 from fastapi import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from core.models import ErrorResponse
 
 
@@ -476,7 +494,7 @@ async def log_requests(request: Request, call_next):
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
     """Handle HTTP exceptions."""
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content=ErrorResponse(
             error=exc.detail,
@@ -496,7 +514,7 @@ async def general_exception_handler(request: Request, exc: Exception):
     else:
         detail = str(exc)
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content=ErrorResponse(
             error="Internal Server Error",
@@ -508,13 +526,60 @@ async def general_exception_handler(request: Request, exc: Exception):
 
 # === STARTUP MESSAGE ===
 
+def select_event_loop() -> str:
+    """Pick the uvicorn loop implementation: uvloop, as in start.sh and railway_start.py (auto on Windows)."""
+    return "auto" if sys.platform == "win32" else "uvloop"
+
+
+def uringcore_loop_factory():
+    """
+    Return uringcore's event loop factory when USE_URINGCORE=1 on Linux (kernel 5.11+), else None.
+
+    uvicorn's own loop setting cannot name uringcore on every supported version
+    (newer releases build a SelectorEventLoop for "asyncio" and ignore the policy),
+    so the launcher runs the server on a loop created by this factory itself.
+    """
+    if os.getenv("USE_URINGCORE") != "1" or not sys.platform.startswith("linux"):
+        return None
+    try:
+        import uringcore
+        return uringcore.EventLoopPolicy().new_event_loop
+    except Exception as e:
+        logger.warning("[LOOP] uringcore unavailable, falling back to uvloop: %s", e)
+        return None
+
+
 if __name__ == "__main__":
     import uvicorn
     
-    uvicorn.run(
-        "main_production:app",
-        host=settings.host,
-        port=settings.port,
-        reload=settings.debug,
-        log_level=settings.log_level.lower()
-    )
+    loop_factory = uringcore_loop_factory()
+    if loop_factory is not None and settings.debug:
+        logger.warning("[LOOP] USE_URINGCORE is ignored with auto-reload (DEBUG=true)")
+        loop_factory = None
+    
+    if loop_factory is None:
+        uvicorn.run(
+            "main_production:app",
+            host=settings.host,
+            port=settings.port,
+            reload=settings.debug,
+            log_level=settings.log_level.lower(),
+            loop=select_event_loop(),
+            http="httptools"
+        )
+    else:
+        # loop="none": uvicorn leaves loop creation to us
+        server = uvicorn.Server(uvicorn.Config(
+            "main_production:app",
+            host=settings.host,
+            port=settings.port,
+            log_level=settings.log_level.lower(),
+            loop="none",
+            http="httptools"
+        ))
+        loop = loop_factory()
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_until_complete(server.serve())
+        finally:
+            loop.close()
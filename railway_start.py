@@ -24,6 +24,8 @@ cmd = [
     "main_production:app",
     "--host", "0.0.0.0",
     "--port", port,
+    "--loop", "uvloop",
+    "--http", "httptools",
     "--log-level", "info"
 ]
 
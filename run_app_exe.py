@@ -35,7 +35,7 @@ except Exception as e:
 
 # Import main after setting paths
 try:
-    from main import app, set_server_instance
+    from main import app, set_server_instance, set_shutdown_event
     import uvicorn
     import threading
 except Exception as e:
@@ -172,9 +172,18 @@ def start_server():
             
             # Register server instance for graceful shutdown
             set_server_instance(server)
+            server_stopped = threading.Event()
+            set_shutdown_event(server_stopped)
+            
+            def run_server():
+                try:
+                    server.run()
+                finally:
+                    # Lets /api/shutdown exit as soon as the server has stopped
+                    server_stopped.set()
             
             # Start server in separate thread
-            server_thread = threading.Thread(target=server.run, daemon=False)
+            server_thread = threading.Thread(target=run_server, daemon=False)
             server_thread.start()
             
             # Wait for server to become available
@@ -9,5 +9,7 @@ echo "🚀 Starting BrainAi on port ${PORT:-8000}..."
 exec uvicorn main_production:app \
     --host 0.0.0.0 \
     --port ${PORT:-8000} \
+    --loop uvloop \
+    --http httptools \
     --log-level info
 
@@ -3,6 +3,7 @@ Tests for API endpoints.
 """
 import pytest
 from fastapi.testclient import TestClient
+import main
 from main import app
 
 client = TestClient(app)
@@ -62,6 +63,43 @@ def test_get_supported_models():
     assert response.status_code == 200
     assert "models" in response.json()
 
+def test_archetypes_etag_revalidation():
+    """Test that a repeated archetypes GET with If-None-Match returns 304."""
+    response = client.get("/api/archetypes")
+    assert response.status_code == 200
+    assert response.headers["cache-control"] == "no-cache"
+    etag = response.headers["etag"]
+    
+    response = client.get("/api/archetypes", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+
+def test_ai_provider_etag_revalidation():
+    """Test that a stale ETag gets the full AI provider body again."""
+    etag = client.get("/api/ai-provider").headers["etag"]
+    assert client.get("/api/ai-provider", headers={"If-None-Match": etag}).status_code == 304
+    
+    response = client.get("/api/ai-provider", headers={"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert "provider" in response.json()
+
+def test_export_history_file_json(monkeypatch):
+    """Test that a JSON export embeds the file and rejects a corrupt one."""
+    async def fake_read(filename):
+        return b'[{"user_input": "hi"}]\n'
+    monkeypatch.setattr(main, "read_history_file", fake_read)
+    response = client.get("/api/history/export/chat.json")
+    assert response.status_code == 200
+    assert response.json() == {"format": "json", "filename": "chat.json", "content": [{"user_input": "hi"}]}
+    
+    async def fake_read_truncated(filename):
+        return b'[{"user_input": "h'
+    monkeypatch.setattr(main, "read_history_file", fake_read_truncated)
+    response = client.get("/api/history/export/chat.json")
+    assert response.status_code == 500
+    assert "not valid JSON" in response.json()["detail"]
+
 
 
 
@@ -0,0 +1,285 @@
+"""
+Tests for chat storage in the database (SQLite in-memory).
+"""
+from types import SimpleNamespace
+
+import orjson
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import core.database
+from core import monitoring
+from core.database import Base, DatabaseManager
+from core.db_models import ChatMessage, User
+import main
+from main import app, _insert_chat_turn, _chat_search_condition, load_chat_history
+
+TEST_DATABASE_URL = "sqlite://"
+TEST_USER_ID = 1
+
+
+@pytest.fixture
+def test_db(monkeypatch):
+    """In-memory database shared by all threads, installed as the app's database."""
+    engine = create_engine(
+        TEST_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+
+    manager = DatabaseManager(TEST_DATABASE_URL)
+    manager.engine = engine
+    manager.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    manager._initialized = True
+    monkeypatch.setattr(core.database, "db_manager", manager)
+
+    session = manager.SessionLocal()
+    session.add(User(id=TEST_USER_ID, email="test@brainai.local", username="test", password_hash="x"))
+    session.commit()
+    main.invalidate_vector_db_list(TEST_USER_ID)
+
+    yield session
+
+    session.close()
+    main.invalidate_vector_db_list(TEST_USER_ID)
+    Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def client(test_db):
+    return TestClient(app)
+
+
+def chat_rows(session, chat_id):
+    return session.query(ChatMessage.message_index, ChatMessage.role, ChatMessage.content).filter(
+        ChatMessage.chat_id == chat_id
+    ).order_by(ChatMessage.message_index).all()
+
+
+def test_insert_chat_turn_indexes(test_db):
+    """Consecutive turns get message_index 0..3 computed inside the INSERT."""
+    _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "q1", "a1")
+    _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "q2", "a2")
+
+    assert chat_rows(test_db, "chat1") == [
+        (0, "user", "q1"),
+        (1, "assistant", "a1"),
+        (2, "user", "q2"),
+        (3, "assistant", "a2"),
+    ]
+
+
+def test_insert_chat_turn_returns_assistant_id(test_db):
+    """The returned id is the assistant row of the turn."""
+    assistant_id = _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "q1", "a1")
+
+    message = test_db.get(ChatMessage, assistant_id)
+    assert message.role == "assistant"
+    assert message.content == "a1"
+    assert message.msg_metadata == {"archetype": "analyst"}
+
+
+def test_insert_chat_turn_indexes_per_chat(test_db):
+    """Each chat numbers its messages independently."""
+    _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "q1", "a1")
+    _insert_chat_turn(test_db, "chat2", TEST_USER_ID, "analyst", "q1", "a1")
+
+    assert [row.message_index for row in chat_rows(test_db, "chat2")] == [0, 1]
+
+
+def test_vector_db_list_cache_is_bounded(test_db, client, monkeypatch):
+    """Only unpaginated lists are cached, capped in size and swept of expired entries."""
+    _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "q1", "a1")
+    monkeypatch.setattr(main, "_vector_db_list_cache", main.OrderedDict())
+
+    client.get("/api/vector-db", params={"limit": 1, "offset": 0})
+    assert TEST_USER_ID not in main._vector_db_list_cache
+    client.get("/api/vector-db")
+    assert list(main._vector_db_list_cache) == [TEST_USER_ID]
+
+    monkeypatch.setattr(main, "VECTOR_DB_LIST_CACHE_MAX", 2)
+    for user_id in (101, 102, 103):
+        main.store_vector_db_list(user_id, b"{}", '"etag"')
+    assert list(main._vector_db_list_cache) == [102, 103]
+
+    monkeypatch.setattr(main, "VECTOR_DB_LIST_TTL", 0)
+    main.store_vector_db_list(104, b"{}", '"etag"')
+    assert list(main._vector_db_list_cache) == []
+
+
+def test_load_chat_history_window(test_db, monkeypatch):
+    """Only the last HISTORY_WINDOW pairs are loaded, oldest first."""
+    monkeypatch.setattr(main, "HISTORY_WINDOW", 2)
+    for i in range(3):
+        _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", f"q{i}", f"a{i}")
+
+    assert load_chat_history(test_db, "chat1", TEST_USER_ID, "default") == [
+        {"user_input": "q1", "archetype": "analyst", "model_response": "a1"},
+        {"user_input": "q2", "archetype": "analyst", "model_response": "a2"},
+    ]
+
+
+def test_vector_db_entry_etag(test_db, client):
+    """A repeated GET of a chat with If-None-Match returns 304 until the chat changes."""
+    _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "q1", "a1")
+
+    response = client.get("/api/vector-db/chat1")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+
+    response = client.get("/api/vector-db/chat1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    assert client.post("/api/vector-db/chat1", json={"document": "edited"}).status_code == 200
+    response = client.get("/api/vector-db/chat1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_vector_db_pagination(test_db, client):
+    """limit/offset window the newest-first chat list; total counts every chat."""
+    for chat_id in ("chat1", "chat2", "chat3"):
+        _insert_chat_turn(test_db, chat_id, TEST_USER_ID, "analyst", f"question in {chat_id}", "a")
+
+    full = client.get("/api/vector-db").json()
+    assert full["count"] == full["total"] == 3
+    all_ids = [entry["id"] for entry in full["entries"]]
+
+    page = client.get("/api/vector-db", params={"limit": 2, "offset": 1}).json()
+    assert page["count"] == 2
+    assert page["total"] == 3
+    assert [entry["id"] for entry in page["entries"]] == all_ids[1:]
+    assert [entry["preview"] for entry in page["entries"]] == [f"question in {chat_id}" for chat_id in all_ids[1:]]
+
+    page = client.get("/api/vector-db", params={"limit": 2, "offset": 3}).json()
+    assert page["entries"] == []
+    assert page["total"] == 3
+
+
+def test_delete_history_chat(test_db, client):
+    """Deleting a chat removes all its messages and reports how many; a second delete is a 404."""
+    _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "q1", "a1")
+    _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "q2", "a2")
+    _insert_chat_turn(test_db, "chat2", TEST_USER_ID, "analyst", "q1", "a1")
+
+    response = client.delete("/history/chat1.json")
+    assert response.status_code == 200
+    assert response.json() == {"status": "deleted", "messages_deleted": 4}
+    assert chat_rows(test_db, "chat1") == []
+    assert len(chat_rows(test_db, "chat2")) == 2
+
+    assert client.delete("/history/chat1.json").status_code == 404
+
+
+def test_history_search_sqlite(test_db, client):
+    """Without Postgres the text query is a case-insensitive substring match."""
+    _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "Quarterly Budget review", "a")
+    _insert_chat_turn(test_db, "chat2", TEST_USER_ID, "writer", "poem about the sea", "a budget poem")
+    _insert_chat_turn(test_db, "chat3", TEST_USER_ID, "writer", "unrelated", "b")
+
+    data = client.get("/api/history/search", params={"query": "budget"}).json()
+    assert sorted(result["filename"] for result in data["results"]) == ["chat1.json", "chat2.json"]
+
+    data = client.get("/api/history/search", params={"query": "budget", "archetype": "Writer"}).json()
+    assert [result["filename"] for result in data["results"]] == ["chat2.json"]
+    assert data["results"][0]["preview"] == "poem about the sea"
+
+    data = client.get("/api/history/search", params={"query": "missing"}).json()
+    assert data["count"] == 0
+
+
+def test_history_search_escapes_wildcards(test_db, client):
+    """% and _ in the query are matched literally, not as LIKE wildcards."""
+    _insert_chat_turn(test_db, "chat1", TEST_USER_ID, "analyst", "growth of 50% in a big year", "a")
+    _insert_chat_turn(test_db, "chat2", TEST_USER_ID, "analyst", "50 new users", "a_b")
+
+    data = client.get("/api/history/search", params={"query": "50%"}).json()
+    assert [result["filename"] for result in data["results"]] == ["chat1.json"]
+
+    data = client.get("/api/history/search", params={"query": "%"}).json()
+    assert [result["filename"] for result in data["results"]] == ["chat1.json"]
+
+    data = client.get("/api/history/search", params={"query": "a_b"}).json()
+    assert [result["filename"] for result in data["results"]] == ["chat2.json"]
+
+    data = client.get("/api/vector-db/search", params={"query": "50%"}).json()
+    assert [result["chat_id"] for result in data["results"]] == ["chat1"]
+
+
+def test_history_search_condition_postgres():
+    """On Postgres the text query uses the GIN-indexed full-text expression."""
+    db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=postgresql.dialect()))
+
+    sql = str(_chat_search_condition(db, "budget").compile(dialect=postgresql.dialect()))
+    assert "to_tsvector" in sql
+    assert "@@ plainto_tsquery" in sql
+
+
+def stream_lines(response):
+    """Parse an NDJSON body, checking every record is exactly one newline-terminated line."""
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert response.content.endswith(b"\n")
+    return [orjson.loads(line) for line in response.content.split(b"\n")[:-1]]
+
+
+def test_process_stream_ndjson(test_db, client, monkeypatch):
+    """Chunks stream as one JSON object per line, then a done line after the turn is saved."""
+    monkeypatch.setattr(main, "process_with_archetype", lambda **kwargs: {"stream": iter(["Hel", "lo\nworld"])})
+
+    response = client.post("/process/stream", json={"text": "q1", "archetype": "analyst", "chat_id": "chat1"})
+    assert response.status_code == 200
+    assert stream_lines(response) == [
+        {"chunk": "Hel"},
+        {"chunk": "lo\nworld"},
+        {"done": True, "cached": False},
+    ]
+    assert chat_rows(test_db, "chat1") == [(0, "user", "q1"), (1, "assistant", "Hello\nworld")]
+
+
+def test_process_stream_cache_hit(test_db, client, monkeypatch):
+    """A cached answer arrives as a single chunk line."""
+    monkeypatch.setattr(main, "process_with_archetype", lambda **kwargs: {"response": "cached answer", "cached": True})
+
+    response = client.post("/process/stream", json={"text": "q1", "archetype": "analyst", "remember": False})
+    assert stream_lines(response) == [{"chunk": "cached answer"}, {"done": True, "cached": True}]
+
+
+def test_process_stream_error(test_db, client, monkeypatch):
+    """A provider failure mid-stream ends the body with an error line and saves nothing."""
+    def failing_stream():
+        yield "partial"
+        raise RuntimeError("provider went away")
+
+    monkeypatch.setattr(main, "process_with_archetype", lambda **kwargs: {"stream": failing_stream()})
+
+    errors_before = monitoring.get_metrics_summary()["counters"].get("api_errors", 0)
+
+    response = client.post("/process/stream", json={"text": "q1", "archetype": "analyst", "chat_id": "chat1"})
+    assert stream_lines(response) == [{"chunk": "partial"}, {"error": "provider went away"}]
+    assert chat_rows(test_db, "chat1") == []
+    assert monitoring.get_metrics_summary()["counters"]["api_errors"] == errors_before + 1
+
+
+def test_process_stream_setup_error(test_db, client, monkeypatch):
+    """A failure before streaming starts is a 500 with detail, counted and timed like /process."""
+    def failing_process(**kwargs):
+        raise RuntimeError("provider misconfigured")
+
+    monkeypatch.setattr(main, "process_with_archetype", failing_process)
+    before = monitoring.get_metrics_summary()
+    errors_before = before["counters"].get("api_errors", 0)
+    timed_before = before["timers"].get("process_request", {}).get("count", 0)
+
+    response = client.post("/process/stream", json={"text": "q1", "archetype": "analyst"})
+    assert response.status_code == 500
+    assert "provider misconfigured" in response.json()["detail"]
+
+    after = monitoring.get_metrics_summary()
+    assert after["counters"]["api_errors"] == errors_before + 1
+    assert after["timers"]["process_request"]["count"] == timed_before + 1
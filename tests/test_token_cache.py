@@ -0,0 +1,70 @@
+"""
+Tests for the verified-token cache in decode_access_token.
+"""
+import time
+from collections import OrderedDict
+
+import pytest
+from fastapi import HTTPException
+from jose import jwt
+
+from core import auth
+from core.auth import decode_access_token, create_access_token, TokenData
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    """Give every test its own empty cache."""
+    monkeypatch.setattr(auth, "_jwt_cache", OrderedDict())
+
+
+def make_token(exp: float) -> str:
+    return jwt.encode({"sub": "1", "email": "test@brainai.local", "exp": int(exp)}, auth.SECRET_KEY, algorithm=auth.ALGORITHM)
+
+
+def test_repeated_decode_is_served_from_cache():
+    """Second decode of the same token returns the cached TokenData."""
+    token = create_access_token(1, "test@brainai.local")
+
+    first = decode_access_token(token)
+    assert decode_access_token(token) is first
+    assert list(auth._jwt_cache) == [token]
+
+
+def test_cache_entry_never_outlives_token_exp():
+    """A token expiring before the cache TTL is cached only until its exp."""
+    exp = int(time.time()) + 5
+    token = make_token(exp)
+
+    decode_access_token(token)
+    assert auth._jwt_cache[token][1] == exp
+
+
+def test_expired_token_is_not_served_from_cache():
+    """An entry past its expiry is dropped and the token is verified again (and rejected)."""
+    exp = int(time.time()) - 10
+    token = make_token(exp)
+    auth._jwt_cache[token] = (TokenData(user_id=1, email="test@brainai.local"), exp)
+
+    with pytest.raises(HTTPException) as exc_info:
+        decode_access_token(token)
+    assert exc_info.value.status_code == 401
+    assert token not in auth._jwt_cache
+
+
+def test_cache_is_bounded(monkeypatch):
+    """The least recently used token is evicted past JWT_CACHE_SIZE."""
+    monkeypatch.setattr(auth, "JWT_CACHE_SIZE", 2)
+    exp = time.time() + 3600
+    tokens = [make_token(exp + i) for i in range(3)]
+
+    for token in tokens:
+        decode_access_token(token)
+    assert list(auth._jwt_cache) == tokens[1:]
+
+
+def test_invalid_token_is_not_cached():
+    """Failed verification raises 401 and leaves nothing in the cache."""
+    with pytest.raises(HTTPException):
+        decode_access_token("not-a-jwt")
+    assert not auth._jwt_cache